@@ -0,0 +1,167 @@
+"""Bulk backfill of ``Artwork.ai_description`` for rows that don't have one.
+
+Candidates are streamed in primary-key order, prompts are built with the
+``ai_service`` builders, and model calls run on a bounded thread pool behind
+a token-bucket rate limiter. Each batch is committed with one executemany
+UPDATE (plus a reindex of the updated rows' search documents) and a
+checkpoint file records the id up to which every candidate succeeded, so an
+interrupted run resumes where it left off. Failed rows stay behind the
+checkpoint (and without a description), so the next run retries them;
+rows that already succeeded past it are skipped by the candidate query.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, update
+from sqlalchemy.orm import configure_mappers, joinedload
+from ai_service import AIServiceError, build_artwork_prompt, invoke_model
+from extensions import db
+from models import Artwork
+import search as search_index
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens/sec, bursts up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get('last_id', 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, last_id):
+    """Record progress atomically so a crash never leaves a torn file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'last_id': last_id}, f)
+    os.replace(tmp, path)
+
+
+def iter_candidate_batches(after_id, batch_size, limit=None):
+    """Yield lists of (artwork_id, prompt) for artworks missing a description.
+
+    Seeks on the primary key rather than using OFFSET, and eager-loads the
+    artist so prompt building doesn't issue a query per row.
+    """
+    configure_mappers()  # Artwork.artist is a backref declared on Artist
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        artworks = db.session.execute(
+            select(Artwork)
+            .options(joinedload(Artwork.artist))
+            .where(Artwork.ai_description.is_(None), Artwork.id > after_id)
+            .order_by(Artwork.id)
+            .limit(size)
+        ).scalars().all()
+        if not artworks:
+            return
+        yield [(aw.id, build_artwork_prompt(aw)) for aw in artworks]
+        after_id = artworks[-1].id
+        db.session.expunge_all()
+        if remaining is not None:
+            remaining -= len(artworks)
+
+
+def run_backfill(app, concurrency=4, rate=2.0, batch_size=50, limit=None,
+                 checkpoint_path=None, restart=False, max_tokens=300):
+    """Fill missing artwork descriptions and return a stats dict."""
+    checkpoint_path = checkpoint_path or os.path.join(app.instance_path,
+                                                      'ai_backfill.checkpoint')
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    start_id = 0 if restart else read_checkpoint(checkpoint_path)
+    bucket = TokenBucket(rate)
+    latencies = []
+    stats = {'processed': 0, 'succeeded': 0, 'failed': 0, 'start_id': start_id,
+             'last_id': start_id, 'checkpoint_id': start_id}
+    # The checkpoint stops short of this run's first failure.
+    blocked = False
+
+    def call(prompt):
+        bucket.acquire()
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                return invoke_model(prompt, max_tokens=max_tokens)
+        except AIServiceError as e:
+            logger.warning(f"Backfill call failed: {e}")
+            return None
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency,
+                            thread_name_prefix='ai-backfill') as pool:
+        for batch in iter_candidate_batches(start_id, batch_size, limit):
+            ids = [artwork_id for artwork_id, _ in batch]
+            results = list(pool.map(call, [prompt for _, prompt in batch]))
+            updates = [{'id': artwork_id, 'ai_description': text}
+                       for artwork_id, text in zip(ids, results) if text]
+            if updates:
+                db.session.execute(update(Artwork), updates)
+                # Bulk UPDATE by primary key skips the session's after_flush
+                # search sync; reindex the rows in the same transaction.
+                search_index.index_rows('artwork', [u['id'] for u in updates])
+            db.session.commit()
+            if not blocked:
+                for artwork_id, text in zip(ids, results):
+                    if not text:
+                        blocked = True
+                        break
+                    stats['checkpoint_id'] = artwork_id
+                write_checkpoint(checkpoint_path, stats['checkpoint_id'])
+
+            stats['processed'] += len(batch)
+            stats['succeeded'] += len(updates)
+            stats['failed'] += len(batch) - len(updates)
+            stats['last_id'] = ids[-1]
+            logger.info(f"Backfill committed {len(updates)}/{len(batch)} "
+                        f"(through id={ids[-1]})")
+
+    elapsed = time.perf_counter() - started
+    stats.update({
+        'elapsed_seconds': elapsed,
+        'items_per_second': stats['processed'] / elapsed if elapsed else 0.0,
+        'p50_latency': percentile(latencies, 50),
+        'p95_latency': percentile(latencies, 95),
+    })
+    return stats
@@ -0,0 +1,151 @@
+"""Content-addressed on-disk cache for generated AI text.
+
+Completions are stored under the SHA-256 of (model id, max_tokens, prompt),
+so regenerating a description from unchanged metadata returns the stored
+text without touching the network. Entries live as one file each under
+``AI_CACHE_DIR``; reads bump the file's mtime, and when the cache grows past
+``AI_CACHE_MAX_BYTES`` or ``AI_CACHE_MAX_ENTRIES`` the least recently used
+files are removed. The directory can be shared by every worker on a host.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model_id, prompt, max_tokens):
+    digest = hashlib.sha256()
+    for part in (model_id, str(max_tokens), prompt):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """LRU-by-mtime file cache with size and entry-count bounds."""
+
+    def __init__(self, directory, max_bytes, max_entries):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Running estimate of the cache size; refreshed on each eviction scan
+        # so the directory isn't walked on every write.
+        self._approx_bytes = None
+        self._approx_entries = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = value.encode('utf-8')
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.writes += 1
+            if self._approx_bytes is None:
+                self._scan_and_evict()
+            else:
+                self._approx_bytes += len(data)
+                self._approx_entries += 1
+                if (self._approx_bytes > self.max_bytes
+                        or self._approx_entries > self.max_entries):
+                    self._scan_and_evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.txt'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+
+    def _scan_and_evict(self):
+        """Recount the directory and drop least recently used entries until
+        both bounds hold. Caller must hold ``_lock``."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes and count <= self.max_entries:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            count -= 1
+            self.evictions += 1
+        self._approx_bytes, self._approx_entries = total, count
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in list(self._entries()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._approx_bytes, self._approx_entries = 0, 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'approx_bytes': self._approx_bytes,
+                'approx_entries': self._approx_entries,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(config):
+    """Return the process's cache for ``AI_CACHE_DIR``, or None if disabled."""
+    if not config.get('AI_CACHE_ENABLED', True):
+        return None
+    directory = config['AI_CACHE_DIR']
+    cache = _caches.get(directory)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(directory)
+            if cache is None:
+                cache = DiskCache(directory, config['AI_CACHE_MAX_BYTES'],
+                                  config['AI_CACHE_MAX_ENTRIES'])
+                _caches[directory] = cache
+    return cache
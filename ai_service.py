@@ -1,32 +1,198 @@
 """AI service for generating artwork and collection descriptions using AWS Bedrock."""
 
+import hashlib
 import json
 import logging
-import boto3
+import os
+import threading
+import time
 from flask import current_app
+from ai_cache import cache_key, get_cache
+import instrumentation
+import metrics
 
 logger = logging.getLogger(__name__)
 
+MODEL_ID = "us.anthropic.claude-sonnet-4-20250514-v1:0"
+
+
+class AIServiceError(Exception):
+    """Raised when the configured model provider can't produce a completion."""
+
+
+# Process-wide Bedrock clients keyed by (profile, region). boto3 clients are
+# thread-safe, and reusing one keeps its credentials, endpoint data and HTTP
+# connection pool instead of rebuilding them on every call.
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Credential errors that mean a cached client is holding rotated-out keys.
+_STALE_CREDENTIAL_ERRORS = {
+    'ExpiredToken', 'ExpiredTokenException', 'UnrecognizedClientException',
+    'InvalidSignatureException',
+}
+
+
+def _reset_clients_after_fork():
+    """Forked children must not share the parent's sockets or lock state."""
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+
+def _build_bedrock_client(profile, region, config):
+    # boto3 takes ~0.2 s to import; only pay for it once Bedrock is used.
+    import boto3
+    from botocore.config import Config as BotoConfig
+    session = boto3.Session(profile_name=profile, region_name=region)
+    return session.client('bedrock-runtime', config=BotoConfig(
+        max_pool_connections=config.get('BEDROCK_MAX_POOL_CONNECTIONS', 10),
+        connect_timeout=config.get('BEDROCK_CONNECT_TIMEOUT', 5),
+        read_timeout=config.get('BEDROCK_READ_TIMEOUT', 60),
+        tcp_keepalive=True,
+        retries={'max_attempts': config.get('BEDROCK_MAX_RETRIES', 3), 'mode': 'standard'},
+    ))
+
 
 def get_bedrock_client():
-    """Create a Bedrock Runtime client using the configured AWS profile."""
+    """Return the shared Bedrock Runtime client for the configured AWS profile.
+
+    Clients are rebuilt after ``BEDROCK_CLIENT_TTL`` seconds so rotated
+    credentials are eventually picked up even without an explicit invalidation.
+    """
+    config = current_app.config
+    key = (config.get('AWS_PROFILE', 'cyber-risk'), config.get('BEDROCK_REGION', 'us-east-1'))
+    ttl = config.get('BEDROCK_CLIENT_TTL', 3600)
+    entry = _clients.get(key)
+    if entry and time.monotonic() - entry[1] < ttl:
+        return entry[0]
+    with _clients_lock:
+        entry = _clients.get(key)
+        if entry and time.monotonic() - entry[1] < ttl:
+            return entry[0]
+        try:
+            client = _build_bedrock_client(*key, config)
+        except Exception as e:
+            logger.error(f"Failed to create Bedrock client: {e}")
+            return None
+        _clients[key] = (client, time.monotonic())
+        logger.info(f"Created Bedrock client for profile={key[0]} region={key[1]}")
+        return client
+
+
+def invalidate_bedrock_clients(profile=None, region=None):
+    """Drop cached clients (all, or those matching profile/region) so the next
+    call resolves credentials afresh, e.g. after a key rotation."""
+    with _clients_lock:
+        for key in list(_clients):
+            if (profile is None or key[0] == profile) and (region is None or key[1] == region):
+                del _clients[key]
+
+
+def _invoke_bedrock(prompt, max_tokens):
+    from botocore.exceptions import ClientError
+    client = get_bedrock_client()
+    if not client:
+        raise AIServiceError("Bedrock client unavailable")
     try:
-        session = boto3.Session(
-            profile_name=current_app.config.get('AWS_PROFILE', 'cyber-risk'),
-            region_name=current_app.config.get('BEDROCK_REGION', 'us-east-1')
+        response = client.invoke_model(
+            modelId=MODEL_ID,
+            contentType="application/json",
+            accept="application/json",
+            body=json.dumps({
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": max_tokens,
+                "messages": [{"role": "user", "content": prompt}]
+            })
         )
-        return session.client('bedrock-runtime')
+        result = json.loads(response["body"].read())
+        return result["content"][0]["text"]
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in _STALE_CREDENTIAL_ERRORS:
+            invalidate_bedrock_clients(current_app.config.get('AWS_PROFILE', 'cyber-risk'))
+        raise AIServiceError(f"Bedrock error: {e}") from e
     except Exception as e:
-        logger.error(f"Failed to create Bedrock client: {e}")
-        return None
+        raise AIServiceError(f"Bedrock error: {e}") from e
 
 
-def generate_artwork_description(artwork):
-    """Generate an AI description for an artwork based on its metadata."""
-    client = get_bedrock_client()
-    if not client:
-        return None
+def _invoke_fake(prompt, max_tokens):
+    """Offline stand-in for Bedrock: deterministic text derived from the prompt.
 
+    Set ``AI_PROVIDER = 'fake'`` to develop and test AI features without AWS
+    credentials; ``AI_FAKE_LATENCY`` simulates a slow model call.
+    """
+    latency = current_app.config.get('AI_FAKE_LATENCY', 0)
+    if latency:
+        time.sleep(latency)
+    digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+    return (f"Offline description {digest}: a placeholder generated from a "
+            f"{len(prompt)}-character prompt (max {max_tokens} tokens).")
+
+
+PROVIDERS = {
+    'bedrock': _invoke_bedrock,
+    'fake': _invoke_fake,
+}
+
+
+def _error_code(error):
+    """Short label for a failed call: the AWS error code, else the exception type."""
+    cause = error.__cause__
+    response = getattr(cause, 'response', None)  # botocore ClientError
+    if isinstance(response, dict) and response.get('Error', {}).get('Code'):
+        return response['Error']['Code']
+    return type(cause or error).__name__
+
+
+def invoke_model(prompt, max_tokens):
+    """Send ``prompt`` to the configured provider and return the completion text.
+
+    Identical (model, prompt, max_tokens) requests are answered from the AI
+    text cache without a network call. Raises AIServiceError on any failure
+    so callers can decide whether to retry.
+    """
+    provider = current_app.config.get('AI_PROVIDER', 'bedrock')
+    try:
+        call = PROVIDERS[provider]
+    except KeyError:
+        raise AIServiceError(f"Unknown AI provider: {provider}") from None
+
+    def invoke(prompt, max_tokens):
+        started = time.perf_counter()
+        error = None
+        try:
+            return call(prompt, max_tokens)
+        except AIServiceError as e:
+            error = _error_code(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            instrumentation.record('ai', elapsed)
+            metrics.observe_ai_call(provider, elapsed, error)
+
+    cache = get_cache(current_app.config)
+    if cache is None:
+        return invoke(prompt, max_tokens)
+    model_id = MODEL_ID if provider == 'bedrock' else provider
+    key = cache_key(model_id, prompt, max_tokens)
+    text = cache.get(key)
+    if text is not None:
+        logger.debug(f"AI cache hit {key[:12]}")
+        return text
+    text = invoke(prompt, max_tokens)
+    try:
+        cache.set(key, text)
+    except OSError as e:
+        logger.warning(f"Could not write AI cache entry: {e}")
+    return text
+
+
+def build_artwork_prompt(artwork):
+    """Build the placard prompt for an artwork from its metadata."""
     artist_name = artwork.artist.name if artwork.artist else "Unknown artist"
 
     details = [f"Title: {artwork.title}", f"Artist: {artist_name}"]
@@ -49,7 +215,7 @@ def generate_artwork_description(artwork):
     if artwork.is_signed:
         details.append(f"Signed: Yes ({artwork.signature_location or 'location unspecified'})")
 
-    prompt = f"""You are a knowledgeable art curator writing a museum placard description.
+    return f"""You are a knowledgeable art curator writing a museum placard description.
 Based on the following artwork details, write a compelling 2-3 sentence description
 that a museum visitor would find informative and engaging. Focus on the artistic
 significance, technique, and historical context.
@@ -58,43 +224,23 @@ significance, technique, and historical context.
 
 Write only the description. No preamble or headers."""
 
-    try:
-        response = client.invoke_model(
-            modelId="us.anthropic.claude-sonnet-4-20250514-v1:0",
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 300,
-                "messages": [{"role": "user", "content": prompt}]
-            })
-        )
-        result = json.loads(response["body"].read())
-        description = result["content"][0]["text"]
-        logger.info(f"Generated description for artwork '{artwork.title}'")
-        return description
-    except Exception as e:
-        logger.error(f"Bedrock error generating artwork description: {e}")
-        return None
-
 
-def generate_collection_description(museum, artworks):
-    """Generate an AI description of a museum's collection when it has 5+ artworks."""
-    client = get_bedrock_client()
-    if not client:
-        return None
+def build_collection_prompt(museum, artworks):
+    """Build the collection-overview prompt for a museum.
 
+    ``artworks`` are rows with ``title``, ``artist_name``, ``medium`` and
+    ``art_movement`` attributes, as returned by one joined query.
+    """
     artwork_summaries = []
     for aw in artworks:
-        artist_name = aw.artist.name if aw.artist else "Unknown"
-        summary = f"- \"{aw.title}\" by {artist_name}"
+        summary = f"- \"{aw.title}\" by {aw.artist_name or 'Unknown'}"
         if aw.medium:
             summary += f" ({aw.medium})"
         if aw.art_movement:
             summary += f", {aw.art_movement}"
         artwork_summaries.append(summary)
 
-    prompt = f"""You are a museum curator writing a collection overview for the {museum.name} in {museum.city}, {museum.country}.
+    return f"""You are a museum curator writing a collection overview for the {museum.name} in {museum.city}, {museum.country}.
 The museum currently holds {len(artworks)} artworks in its collection:
 
 {chr(10).join(artwork_summaries)}
@@ -105,21 +251,24 @@ page. Write in a professional, engaging tone suitable for museum visitors.
 
 Write only the description. No preamble or headers."""
 
+
+def generate_artwork_description(artwork):
+    """Generate an AI description for an artwork based on its metadata."""
     try:
-        response = client.invoke_model(
-            modelId="us.anthropic.claude-sonnet-4-20250514-v1:0",
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 400,
-                "messages": [{"role": "user", "content": prompt}]
-            })
-        )
-        result = json.loads(response["body"].read())
-        description = result["content"][0]["text"]
+        description = invoke_model(build_artwork_prompt(artwork), max_tokens=300)
+        logger.info(f"Generated description for artwork '{artwork.title}'")
+        return description
+    except AIServiceError as e:
+        logger.error(f"Error generating artwork description: {e}")
+        return None
+
+
+def generate_collection_description(museum, artworks):
+    """Generate an AI description of a museum's collection when it has 5+ artworks."""
+    try:
+        description = invoke_model(build_collection_prompt(museum, artworks), max_tokens=400)
         logger.info(f"Generated collection description for '{museum.name}'")
         return description
-    except Exception as e:
-        logger.error(f"Bedrock error generating collection description: {e}")
+    except AIServiceError as e:
+        logger.error(f"Error generating collection description: {e}")
         return None
@@ -0,0 +1,317 @@
+"""Route-level benchmarks against synthetic datasets.
+
+    python benchmarks/run.py run --scales 1000,100000 --output results.json
+    python benchmarks/run.py compare baseline.json results.json --threshold 20
+
+``run`` builds (once, then reuses) a SQLite database per scale with
+``synthetic_data.py`` and drives the real routes through the Flask test
+client, signed in as the admin. Each scale runs in its own process so
+module-level caches and allocator state don't leak between scales. Per
+route it records the latency distribution, the SQL statements issued per
+request and the peak Python memory allocated while serving one request
+(tracemalloc, measured in a separate untimed pass since tracing slows
+everything down).
+
+A route that answers any request with a non-2xx status (an error page or a
+redirect to the login form is fast, but not the page being measured) is
+reported as failed and ``run`` exits with status 1 after writing its
+results.
+
+``compare`` exits with status 1 when any route failed, or its latency or
+peak memory got worse than ``--threshold`` percent, or it issues more SQL
+statements, than in the baseline file.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, 'benchmarks', '.data')
+DEFAULT_SCALES = '1000,10000,100000'
+
+# name -> (method, url or url factory, request kwargs, measured iterations)
+# URL factories get the artwork count so "?page=N" can sit mid-catalogue.
+ROUTES = {
+    'index': ('GET', '/', {}, None),
+    'artworks_first_page': ('GET', '/artworks?page=1', {}, None),
+    'artworks_middle_page': ('GET', lambda n: f'/artworks?page={max(1, n // 40)}', {}, None),
+    'collections': ('GET', '/collections', {}, None),
+    'export_artworks': ('GET', '/export/artworks', {}, 3),
+    'sql_playground': ('POST', '/sql-playground', {'data': {
+        'table': 'artworks', 'columns': 'id, title, estimated_value',
+        'where_column': 'art_movement', 'where_operator': '=', 'where_value': 'Baroque',
+        'order_by': 'title', 'limit': 50,
+    }}, None),
+}
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _summary(samples):
+    return {
+        'min': min(samples),
+        'p50': statistics.median(samples),
+        'p90': _percentile(samples, 90),
+        'p95': _percentile(samples, 95),
+        'max': max(samples),
+        'mean': statistics.fmean(samples),
+    }
+
+
+def _dataset(scale, seed):
+    return os.path.join(DATA_DIR, f'bench-{scale}-seed{seed}.db')
+
+
+class _StatementCounter:
+    """Counts statements sent by the current thread."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self.thread = threading.get_ident()
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread:
+            self.count += 1
+
+
+def _ok(status):
+    return 200 <= status < 300
+
+
+def _request(client, method, url, kwargs):
+    response = client.open(url, method=method, **kwargs)
+    # Drain streamed bodies (exports) chunk by chunk, so their queries are
+    # part of the request but the body isn't held in memory here.
+    size = 0
+    for chunk in response.iter_encoded():
+        size += len(chunk)
+    response.close()
+    return response.status_code, size
+
+
+def bench_scale(scale, seed, iterations, warmup, routes):
+    """Benchmark ``routes`` against the dataset for ``scale``; runs in the
+    child process started by ``run``."""
+    sys.path.insert(0, ROOT)
+    from museums_app import create_app
+    from extensions import db
+    from models import Artwork, User
+    from sqlalchemy import func, select
+    import playground
+    import synthetic_data
+
+    app = create_app('development')
+    app.debug = False
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        if not db.session.execute(select(Artwork.id).limit(1)).first():
+            synthetic_data.generate(scale, seed=seed, echo=lambda message: None)
+        artworks = db.session.execute(select(func.count()).select_from(Artwork)).scalar()
+        admin = db.session.execute(select(User.id).where(User.is_admin.is_(True))).scalar()
+        counter = _StatementCounter(db.engine)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin)
+        session['_fresh'] = True
+
+    results = {}
+    for name in routes:
+        method, url, kwargs, route_iterations = ROUTES[name]
+        url = url(artworks) if callable(url) else url
+        # Playground results are cached by table version; clear them so
+        # every iteration runs the query.
+        before = playground.result_cache.clear if name == 'sql_playground' else (lambda: None)
+        statuses = set()
+        for _ in range(warmup):
+            before()
+            statuses.add(_request(client, method, url, kwargs)[0])
+
+        latencies, statements = [], []
+        for _ in range(route_iterations or iterations):
+            before()
+            counter.count = 0
+            started = time.perf_counter()
+            status, size = _request(client, method, url, kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statements.append(counter.count)
+            statuses.add(status)
+
+        before()
+        tracemalloc.start()
+        statuses.add(_request(client, method, url, kwargs)[0])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        failures = sorted(s for s in statuses if not _ok(s))
+        results[name] = {
+            'method': method,
+            'url': url,
+            # The first unexpected status, if any request got one.
+            'status': failures[0] if failures else status,
+            'response_bytes': size,
+            'iterations': len(latencies),
+            'latency_ms': _summary(latencies),
+            'sql_statements': max(statements),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+    return {'artworks': artworks, 'routes': results}
+
+
+@click.group()
+def cli():
+    """Route benchmarks."""
+
+
+@cli.command('run')
+@click.option('--scales', default=DEFAULT_SCALES, show_default=True,
+              help='Comma-separated artwork counts; one dataset each.')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--iterations', default=20, show_default=True, help='Measured requests per route.')
+@click.option('--warmup', default=2, show_default=True, help='Unmeasured requests per route first.')
+@click.option('--route', 'routes', multiple=True, type=click.Choice(list(ROUTES)),
+              help='Only these routes (repeatable).')
+@click.option('--rebuild', is_flag=True, help='Regenerate the datasets.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None,
+              help='Write results JSON here (default: stdout).')
+def run_command(scales, seed, iterations, warmup, routes, rebuild, output):
+    """Benchmark every route at every scale."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'iterations': iterations,
+        'scales': {},
+    }
+    failed = []
+    for scale in [int(s) for s in scales.split(',') if s.strip()]:
+        path = _dataset(scale, seed)
+        if rebuild and os.path.exists(path):
+            os.remove(path)
+        click.echo(f"Scale {scale}: {'building' if not os.path.exists(path) else 'using'} {path}",
+                   err=True)
+        env = {**os.environ, 'DATABASE_URL': f'sqlite:///{path}', 'AI_PROVIDER': 'fake',
+               'JOBS_WORKER': 'external'}
+        args = [sys.executable, os.path.abspath(__file__), 'scale', str(scale),
+                '--seed', str(seed), '--iterations', str(iterations), '--warmup', str(warmup)]
+        for name in routes:
+            args += ['--route', name]
+        child = subprocess.run(args, env=env, stdout=subprocess.PIPE, check=True)
+        report['scales'][str(scale)] = result = json.loads(child.stdout)
+        for name, route in result['routes'].items():
+            latency = route['latency_ms']
+            line = (f"  {name:<22} p50 {latency['p50']:8.1f} ms  p95 {latency['p95']:8.1f} ms  "
+                    f"{route['sql_statements']:3d} SQL  {route['peak_memory_kb']:9.1f} KiB peak")
+            if not _ok(route['status']):
+                failed.append(f"{name} at scale {scale}")
+                click.secho(f"{line}  FAILED (HTTP {route['status']})", fg='red', err=True)
+            else:
+                click.echo(line, err=True)
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as fileobj:
+            fileobj.write(text + '\n')
+        click.echo(f"Results written to {output}", err=True)
+    else:
+        click.echo(text)
+    if failed:
+        click.echo(f"\n{len(failed)} route(s) answered with a non-2xx status: "
+                   f"{', '.join(failed)}", err=True)
+        sys.exit(1)
+
+
+@cli.command('scale', hidden=True)
+@click.argument('scale', type=int)
+@click.option('--seed', type=int, required=True)
+@click.option('--iterations', type=int, required=True)
+@click.option('--warmup', type=int, required=True)
+@click.option('--route', 'routes', multiple=True)
+def scale_command(scale, seed, iterations, warmup, routes):
+    """Child process for one scale; prints its results as JSON."""
+    import logging
+    logging.disable(logging.INFO)
+    result = bench_scale(scale, seed, iterations, warmup, routes or list(ROUTES))
+    sys.stdout.write(json.dumps(result))
+
+
+def compare(baseline, current, threshold, metric='p50', min_delta_ms=1.0):
+    """Return ``(rows, regressions)`` comparing two ``run`` reports.
+
+    A route whose current status isn't 2xx always regresses, whatever its
+    timings. Latency regresses when ``metric`` grows by more than
+    ``threshold`` percent *and* ``min_delta_ms``, so sub-millisecond jitter
+    on fast routes doesn't fail a build; peak memory by more than
+    ``threshold`` percent; the SQL statement count by any amount.
+    """
+    rows, regressions = [], []
+    for scale, result in current['scales'].items():
+        base_routes = baseline['scales'].get(scale, {}).get('routes', {})
+        for name, route in result['routes'].items():
+            base = base_routes.get(name)
+            if not _ok(route['status']):
+                rows.append((scale, name, 'status', base['status'] if base else 0,
+                             route['status'], 0.0, True))
+                regressions.append(rows[-1])
+                continue
+            if base is None:
+                continue
+            checks = [
+                ('latency', base['latency_ms'][metric], route['latency_ms'][metric],
+                 lambda old, new: new - old > min_delta_ms),
+                ('memory', base['peak_memory_kb'], route['peak_memory_kb'], lambda old, new: True),
+            ]
+            for label, old, new, significant in checks:
+                change = (new - old) / old * 100 if old else 0.0
+                failed = change > threshold and significant(old, new)
+                rows.append((scale, name, label, old, new, change, failed))
+                if failed:
+                    regressions.append(rows[-1])
+            old, new = base['sql_statements'], route['sql_statements']
+            change = (new - old) / old * 100 if old else 0.0
+            rows.append((scale, name, 'sql', old, new, change, new > old))
+            if new > old:
+                regressions.append(rows[-1])
+    return rows, regressions
+
+
+@cli.command('compare')
+@click.argument('baseline', type=click.File())
+@click.argument('current', type=click.File())
+@click.option('--threshold', type=float, default=lambda: float(os.environ.get('BENCH_THRESHOLD', 20)),
+              show_default='20, or BENCH_THRESHOLD', help='Allowed regression in percent.')
+@click.option('--metric', type=click.Choice(['p50', 'p90', 'p95', 'mean']), default='p50',
+              show_default=True, help='Latency statistic to compare.')
+@click.option('--min-delta-ms', type=float, default=1.0, show_default=True,
+              help='Ignore latency changes smaller than this.')
+def compare_command(baseline, current, threshold, metric, min_delta_ms):
+    """Fail if CURRENT regressed against BASELINE."""
+    rows, regressions = compare(json.load(baseline), json.load(current),
+                                threshold, metric, min_delta_ms)
+    for scale, name, label, old, new, change, failed in rows:
+        line = f"{scale:>8} {name:<22} {label:<8} {old:>12.1f} -> {new:>12.1f} ({change:+6.1f}%)"
+        click.secho(line + ('  REGRESSION' if failed else ''), fg='red' if failed else None)
+    if regressions:
+        click.echo(f"\n{len(regressions)} regression(s) beyond {threshold:g}%")
+        sys.exit(1)
+    click.echo(f"\nNo regressions beyond {threshold:g}%")
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,84 @@
+"""Time-to-first-request for a server command.
+
+    python benchmarks/startup.py --runs 5 -- gunicorn --bind 127.0.0.1:{port} "museums_app:create_app()"
+    python benchmarks/startup.py --runs 5 -- gunicorn -c gunicorn.conf.py --bind 127.0.0.1:{port} "museums_app:create_app()"
+
+Starts the command (``{port}`` is replaced by ``--port``), polls ``--url``
+until it answers, then stops the server. Reports how long the first
+response took and, with ``--requests``, how long until that many
+concurrent requests had all been answered, which is when every worker of a
+multi-worker server has finished booting.
+"""
+
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _get(url, timeout):
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def measure(command, url, requests, timeout):
+    """Return (seconds to first response, seconds until ``requests``
+    concurrent requests have all been answered)."""
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        while _get(url, 1) is None:
+            if server.poll() is not None:
+                raise click.ClickException(f"Server exited with status {server.returncode}")
+            if time.perf_counter() - started > timeout:
+                raise click.ClickException(f"No response from {url} within {timeout}s")
+            time.sleep(0.01)
+        first = time.perf_counter() - started
+        with ThreadPoolExecutor(requests) as pool:
+            list(pool.map(lambda _: _get(url, timeout), range(requests)))
+        return first, time.perf_counter() - started
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+
+@click.command(context_settings={'ignore_unknown_options': True})
+@click.option('--runs', default=5, show_default=True)
+@click.option('--port', default=5055, show_default=True)
+@click.option('--path', default='/', show_default=True, help='URL path to request.')
+@click.option('--requests', default=8, show_default=True,
+              help='Concurrent requests sent after the first response.')
+@click.option('--timeout', default=60.0, show_default=True)
+@click.argument('command', nargs=-1, required=True, type=click.UNPROCESSED)
+def main(runs, port, path, requests, timeout, command):
+    """Run COMMAND --runs times and report startup latency."""
+    command = [part.replace('{port}', str(port)) for part in command]
+    url = f'http://127.0.0.1:{port}{path}'
+    firsts, alls = [], []
+    for run in range(runs):
+        first, everyone = measure(command, url, requests, timeout)
+        firsts.append(first)
+        alls.append(everyone)
+        click.echo(f"run {run + 1}: first response {first:.2f}s, "
+                   f"{requests} concurrent answered at {everyone:.2f}s", err=True)
+    click.echo(f"median first response {statistics.median(firsts):.2f}s, "
+               f"all {requests} answered {statistics.median(alls):.2f}s")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Conditional GET (ETag / Last-Modified) for pages built from catalogue tables.
+
+A view decorated with ``conditional_get('artworks', 'artists')`` gets a weak
+ETag derived from the URL (path and query arguments), the viewer (user id
+and admin flag, since the navbar and edit buttons differ), a build id and
+the current ``table_versions`` of those tables, read in one query. A
+matching ``If-None-Match`` (or, without one, a fresh enough
+``If-Modified-Since``) is answered with 304 before the view runs, so no
+page queries or template rendering happen. ``Last-Modified`` is the latest
+``table_versions.updated_at`` of the tables.
+
+Requests with flashed messages waiting are never answered with 304 (and
+their responses carry no validators), since the page has to show them.
+
+The build id is ``ETAG_SALT`` when set (e.g. the deployed commit), else a
+hash of the application's Python and template files, so a deploy that
+changes the markup invalidates every ETag.
+"""
+
+import hashlib
+import json
+import os
+from datetime import timezone
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+from models import table_stamps
+
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+def _build_id(root):
+    digest = hashlib.sha1()
+    for folder, suffix in ((root, '.py'), (os.path.join(root, 'templates'), '.html')):
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(suffix):
+                with open(os.path.join(folder, name), 'rb') as fileobj:
+                    digest.update(name.encode() + b'\0' + fileobj.read())
+    return digest.hexdigest()[:16]
+
+
+def _etag(stamps):
+    viewer = ([current_user.id, bool(current_user.is_admin)]
+              if current_user.is_authenticated else None)
+    key = [
+        current_app.config['ETAG_SALT'],
+        request.path,
+        sorted(request.args.items(multi=True)),
+        viewer,
+        sorted((name, version) for name, (version, _) in stamps.items()),
+    ]
+    return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+
+
+def _last_modified(stamps):
+    stamps = [updated_at for _, updated_at in stamps.values() if updated_at is not None]
+    if not stamps:
+        return None
+    latest = max(stamps)
+    # Stored as naive UTC (SQLite, Postgres timestamp without time zone).
+    return latest if latest.tzinfo else latest.replace(tzinfo=timezone.utc)
+
+
+def conditional_get(*tables):
+    """Answer conditional GETs for a view whose output depends only on the
+    URL, the viewer and ``tables``."""
+    def decorator(view):
+        @wraps(view)
+        def decorated_function(*args, **kwargs):
+            if (not current_app.config['CONDITIONAL_GET']
+                    or request.method not in CACHEABLE_METHODS or session.get('_flashes')):
+                return view(*args, **kwargs)
+            stamps = table_stamps(tables)
+            etag = _etag(stamps)
+            last_modified = _last_modified(stamps)
+            if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            else:
+                response = current_app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Revalidate on every use; pages of signed-in users stay out of
+            # shared caches.
+            response.cache_control.no_cache = True
+            if current_user.is_authenticated:
+                response.cache_control.private = True
+            return response
+        return decorated_function
+    return decorator
+
+
+def init_app(app):
+    """Fill in ``ETAG_SALT`` from the application's files unless configured."""
+    if not app.config.get('ETAG_SALT'):
+        app.config['ETAG_SALT'] = _build_id(app.root_path)
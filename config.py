@@ -16,14 +16,83 @@ class Config:
         f"sqlite:///{os.path.join(basedir, 'museum.db')}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # What create_app does about the schema: 'create' adds missing tables and
+    # the search index, 'check' only fails fast if tables are missing, 'off'
+    # skips it (migrations own the schema). gunicorn.conf.py preloads the app
+    # so this runs once in the master, not once per worker.
+    SCHEMA_BOOTSTRAP = os.environ.get('SCHEMA_BOOTSTRAP', 'create')
+    # Optional read replica for read-only views (replica.py). Clients are kept
+    # on the primary for REPLICA_STICKY_SECONDS after a write; the replica is
+    # probed at most every REPLICA_CHECK_INTERVAL seconds.
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', '10'))
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', '5'))
 
     # Application Settings
     ITEMS_PER_PAGE = 20
+    # 'offset' (numbered pages) or 'keyset' (cursor tokens). Any request that
+    # carries a ?cursor= argument uses keyset mode regardless.
+    PAGINATION_MODE = os.environ.get('PAGINATION_MODE', 'offset')
+    PAGINATION_APPROX_TOTAL = os.environ.get('PAGINATION_APPROX_TOTAL', '1') == '1'
+    # Per-request timing (instrumentation.py): Server-Timing header on every
+    # response, and a warning log for statements slower than SLOW_QUERY_MS (0 = off)
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+    # Prometheus /metrics endpoint (metrics.py); unauthenticated, so restrict
+    # it at the proxy if the app is publicly reachable
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    # ETag/Last-Modified on the index and list pages (conditional.py).
+    # ETAG_SALT defaults to a hash of the app's code and templates.
+    CONDITIONAL_GET = os.environ.get('CONDITIONAL_GET', '1') == '1'
+    ETAG_SALT = os.environ.get('ETAG_SALT')
+    # Rendered gallery cards ({% cache %} in templates, fragment_cache.py):
+    # per-process LRU of FRAGMENT_CACHE_SIZE entries, plus an optional
+    # directory shared by the workers on a host
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '5000'))
+    FRAGMENT_CACHE_DIR = os.environ.get('FRAGMENT_CACHE_DIR')
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', '100000'))
+    # Seconds artwork facet counts are reused for an identical filter set
+    FACET_CACHE_TTL = int(os.environ.get('FACET_CACHE_TTL', '30'))
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    # Rows per transaction for CSV/JSONL imports (importer.py)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
 
     # AWS Bedrock (for AI features)
     AWS_PROFILE = os.environ.get('AWS_PROFILE', 'cyber-risk')
     BEDROCK_REGION = os.environ.get('BEDROCK_REGION', 'us-east-1')
+    BEDROCK_MAX_POOL_CONNECTIONS = int(os.environ.get('BEDROCK_MAX_POOL_CONNECTIONS', '10'))
+    BEDROCK_CONNECT_TIMEOUT = float(os.environ.get('BEDROCK_CONNECT_TIMEOUT', '5'))
+    BEDROCK_READ_TIMEOUT = float(os.environ.get('BEDROCK_READ_TIMEOUT', '60'))
+    BEDROCK_MAX_RETRIES = int(os.environ.get('BEDROCK_MAX_RETRIES', '3'))
+    BEDROCK_CLIENT_TTL = int(os.environ.get('BEDROCK_CLIENT_TTL', '3600'))
+    # 'bedrock' calls AWS; 'fake' returns deterministic offline text
+    AI_PROVIDER = os.environ.get('AI_PROVIDER', 'bedrock')
+    AI_FAKE_LATENCY = float(os.environ.get('AI_FAKE_LATENCY', '0'))
+
+    # Content-addressed cache of generated text, shared by workers on a host
+    AI_CACHE_ENABLED = os.environ.get('AI_CACHE_ENABLED', '1') == '1'
+    AI_CACHE_DIR = os.environ.get('AI_CACHE_DIR', os.path.join(basedir, 'instance', 'ai_cache'))
+    AI_CACHE_MAX_BYTES = int(os.environ.get('AI_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', '50000'))
+
+    # Background jobs: 'thread' runs a worker pool inside each web process,
+    # 'external' leaves the queue to a separate `flask jobs work` process.
+    JOBS_WORKER = os.environ.get('JOBS_WORKER', 'thread')
+    JOBS_WORKER_THREADS = int(os.environ.get('JOBS_WORKER_THREADS', '4'))
+    JOBS_POLL_INTERVAL = 2.0
+    JOBS_MAX_ATTEMPTS = 5
+    JOBS_RETRY_BASE_SECONDS = 2
+    JOBS_RETRY_MAX_SECONDS = 300
+    JOBS_STALE_SECONDS = 600
+
+    # SQL playground: per-query deadline (seconds) and hard row cap
+    PLAYGROUND_TIMEOUT = float(os.environ.get('PLAYGROUND_TIMEOUT', '5'))
+    PLAYGROUND_MAX_ROWS = int(os.environ.get('PLAYGROUND_MAX_ROWS', '1000'))
+    # Results cached per process; invalidated by table version (models.TableVersion)
+    PLAYGROUND_CACHE_SIZE = int(os.environ.get('PLAYGROUND_CACHE_SIZE', '128'))
 
 
 class DevelopmentConfig(Config):
@@ -41,6 +110,8 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'test.db')}"
+    AI_PROVIDER = 'fake'
+    JOBS_WORKER = 'external'
 
 
 config = {
@@ -0,0 +1,355 @@
+"""Facet filters and facet counts for the artworks list.
+
+Filters come from the query string: repeatable ``art_movement``, ``medium``,
+``subject`` and ``is_signed`` values (OR within a facet, AND across facets),
+plus ``year_from``/``year_to`` on ``creation_date`` and ``value_min``/
+``value_max`` on ``estimated_value``.
+
+Counts are disjunctive: each facet is counted under every active filter
+except its own, so selecting "Baroque" still shows how many artworks the
+other movements would add. They are tallied in Python from a facet table:
+the number of artworks per combination of the four facet values, typically
+a few hundred rows however many artworks there are, from which any
+combination of facet selections can be counted.
+
+* Without a range filter that table is ``facet_counts``
+  (``models.FacetCount``), which the flush listeners below keep current in
+  the transaction that writes the artworks, so counts never need a pass
+  over the artworks table.
+* With a year or value range, the combinations are grouped from the
+  artworks in range (an index range scan); every facet selection within the
+  same range shares that result. Past ``MAX_TABLE_CELLS`` combinations it
+  falls back to one ``UNION ALL`` of per-facet grouped aggregates.
+
+Results are held in a small TTL cache keyed on the ``artworks`` table
+version (``models.table_versions``), so a write from any process stops this
+one serving the old counts, just as it changes the page's ETag.
+"""
+
+import threading
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import (case, delete, event, false, func, literal, literal_column, or_, select,
+                        true, union_all, update)
+from extensions import db
+from models import Artwork, FacetCount, bump_versions, table_versions
+
+
+def _signed_filter(values):
+    # Filter on the bare column (not the CASE used for grouping) so an index
+    # on is_signed stays usable; NULL counts as unsigned.
+    if set(values) >= {'0', '1'}:
+        return true()
+    if '1' in values:
+        return Artwork.is_signed.is_(True)
+    return or_(Artwork.is_signed.is_(False), Artwork.is_signed.is_(None))
+
+
+# facet name -> (grouping expression, filter builder, value label function)
+FACETS = {
+    'art_movement': (Artwork.art_movement, Artwork.art_movement.in_, str),
+    'medium': (Artwork.medium, Artwork.medium.in_, str),
+    'subject': (Artwork.subject, Artwork.subject.in_, str),
+    'is_signed': (case((Artwork.is_signed.is_(True), '1'), else_='0'), _signed_filter,
+                  lambda v: 'Signed' if v == '1' else 'Unsigned'),
+}
+
+# Values shown per facet; the rest are summarised as "more".
+MAX_FACET_VALUES = 15
+# Above this many distinct facet combinations the facet table stops being
+# cheaper than querying, and counts always come from the database.
+MAX_TABLE_CELLS = 20000
+RANGE_FILTERS = ('year_from', 'year_to', 'value_min', 'value_max')
+CELL_KEY = ('art_movement', 'medium', 'subject', 'is_signed')
+
+
+def _year(value):
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        return None
+    return year if 1 <= year <= 9999 else None
+
+
+def _decimal(value):
+    try:
+        number = Decimal(value)
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+    return number if number.is_finite() else None
+
+
+def parse_filters(args):
+    """Normalise request args into ``{name: value}``, dropping invalid input.
+
+    Facet values become sorted tuples so equal selections compare (and
+    cache) equally regardless of parameter order.
+    """
+    filters = {}
+    for name in FACETS:
+        values = tuple(sorted({v for v in args.getlist(name) if v}))
+        if values:
+            filters[name] = values
+    for name, parse in (('year_from', _year), ('year_to', _year),
+                        ('value_min', _decimal), ('value_max', _decimal)):
+        value = parse(args.get(name))
+        if value is not None:
+            filters[name] = value
+    return filters
+
+
+def conditions(filters, exclude=None):
+    """WHERE clauses for ``filters``, leaving out the facet named ``exclude``."""
+    clauses = []
+    for name, (_, build, _) in FACETS.items():
+        if name in filters and name != exclude:
+            clauses.append(build(filters[name]))
+    if 'year_from' in filters:
+        clauses.append(Artwork.creation_date >= date(filters['year_from'], 1, 1))
+    if 'year_to' in filters:
+        clauses.append(Artwork.creation_date <= date(filters['year_to'], 12, 31))
+    if 'value_min' in filters:
+        clauses.append(Artwork.estimated_value >= filters['value_min'])
+    if 'value_max' in filters:
+        clauses.append(Artwork.estimated_value <= filters['value_max'])
+    return clauses
+
+
+def apply_filters(query, filters):
+    return query.filter(*conditions(filters)) if filters else query
+
+
+def facet_counts_query(filters):
+    """One statement returning (facet, value, count) rows for every facet."""
+    branches = []
+    for name, (column, _, _) in FACETS.items():
+        branches.append(
+            select(literal(name).label('facet'), column.label('value'),
+                   func.count().label('n'))
+            .select_from(Artwork)
+            .where(column.is_not(None), *conditions(filters, exclude=name))
+            .group_by(column)
+        )
+    return union_all(*branches)
+
+
+def _counts_from_query(filters):
+    grouped = {name: {} for name in FACETS}
+    for facet, value, n in db.session.execute(facet_counts_query(filters)):
+        grouped[facet][str(value)] = n
+    return grouped
+
+
+def facet_table(filters=None):
+    """(art_movement, medium, subject, is_signed, count) for every combination
+    present among the artworks in ``filters``' ranges (facet selections are
+    ignored), or None if there are more than ``MAX_TABLE_CELLS``."""
+    ranges = {name: value for name, value in (filters or {}).items() if name in RANGE_FILTERS}
+    if ranges:
+        columns = [column for column, _, _ in FACETS.values()]
+        stmt = (select(*columns, func.count()).where(*conditions(ranges))
+                .group_by(*columns))
+    else:
+        stmt = select(*(FacetCount.__table__.c[name] for name in CELL_KEY),
+                      FacetCount.n).where(FacetCount.n > 0)
+    rows = db.session.execute(stmt.limit(MAX_TABLE_CELLS + 1)).all()
+    if len(rows) > MAX_TABLE_CELLS:
+        return None
+    if ranges:
+        return [tuple(row) for row in rows]
+    return [(movement or None, medium or None, subject or None, '1' if signed else '0', n)
+            for movement, medium, subject, signed, n in rows]
+
+
+def _counts_from_table(table, filters):
+    names = list(FACETS)
+    selected = [set(filters.get(name, ())) for name in names]
+    grouped = {name: {} for name in names}
+    for *values, n in table:
+        # Facets whose selection this combination fails; it can only count
+        # towards a facet if every *other* facet's selection matches.
+        misses = [i for i, value in enumerate(values)
+                  if selected[i] and value not in selected[i]]
+        if len(misses) > 1:
+            continue
+        for i, (name, value) in enumerate(zip(names, values)):
+            if value is None or (misses and misses[0] != i):
+                continue
+            counts = grouped[name]
+            counts[value] = counts.get(value, 0) + n
+    return grouped
+
+
+def _format(grouped, filters):
+    facets = {}
+    for name, counts in grouped.items():
+        selected = set(filters.get(name, ()))
+        rows = sorted({**dict.fromkeys(selected, 0), **counts}.items(),
+                      key=lambda row: (-row[1], row[0]))
+        # Keep selected values visible (so they can be unticked) even when
+        # they match nothing or fall outside the top N.
+        shown = rows[:MAX_FACET_VALUES]
+        shown += [r for r in rows[MAX_FACET_VALUES:] if r[0] in selected]
+        label = FACETS[name][2]
+        facets[name] = {
+            'values': [{'value': v, 'label': label(v), 'count': n,
+                        'selected': v in selected} for v, n in shown],
+            'more': max(0, len(rows) - len(shown)),
+        }
+    return facets
+
+
+class _TTLCache:
+    """Small thread-safe TTL cache for facet results."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                for k in [k for k, (expires, _) in self._entries.items() if expires < now]:
+                    del self._entries[k]
+                if len(self._entries) >= self.max_entries:
+                    # Still full: drop the entry closest to expiring.
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _TTLCache()
+
+
+def _cached(key, compute, ttl):
+    if not ttl:
+        return compute()
+    value = _cache.get(key)
+    if value is None:
+        value = compute()
+        _cache.set(key, value, ttl)
+    return value
+
+
+def facet_counts(filters, ttl=30):
+    """Facet values with counts for the artworks matching ``filters``."""
+    version = table_versions(['artworks'])['artworks'] if ttl else None
+    ranges = tuple(sorted((name, value) for name, value in filters.items()
+                          if name in RANGE_FILTERS))
+    table = _cached(('facet_table', version, ranges), lambda: facet_table(filters) or (), ttl)
+    if table:
+        return _format(_counts_from_table(table, filters), filters)
+    key = (version, tuple(sorted(filters.items())))
+    return _cached(key, lambda: _format(_counts_from_query(filters), filters), ttl)
+
+
+def invalidate():
+    """Drop this process's cached counts."""
+    _cache.clear()
+
+
+def _cell_key():
+    """Per-artwork facet_counts key, as SQL expressions."""
+    # Literal defaults: Postgres only matches GROUP BY expressions to the
+    # select list when they have no bind parameters.
+    return [
+        func.coalesce(Artwork.art_movement, literal_column("''")),
+        func.coalesce(Artwork.medium, literal_column("''")),
+        func.coalesce(Artwork.subject, literal_column("''")),
+        func.coalesce(Artwork.is_signed, false()),
+    ]
+
+
+def rebuild_counts(conn=None):
+    """Recompute ``facet_counts`` from the artworks table, e.g. after a Core
+    bulk write, in ``conn``'s (by default the session's) transaction.
+
+    Bumps the artworks version, so every process drops its cached counts
+    once the caller commits.
+    """
+    conn = conn or db.session.connection()
+    key = _cell_key()
+    table = FacetCount.__table__
+    conn.execute(delete(table))
+    conn.execute(table.insert().from_select(
+        [*CELL_KEY, 'n'], select(*key, func.count()).group_by(*key)))
+    bump_versions(conn, {'artworks'})
+    invalidate()
+
+
+def ensure_counts():
+    """Fill an empty ``facet_counts`` when there are artworks, e.g. after
+    ``create_all()`` added the table to an existing database."""
+    if (db.session.execute(select(FacetCount.n).limit(1)).first() is None
+            and db.session.execute(select(Artwork.id).limit(1)).first() is not None):
+        rebuild_counts()
+    db.session.commit()
+
+
+def _cells(conn, ids):
+    """``{artwork id: facet_counts key}`` as the rows stand in ``conn``'s
+    transaction."""
+    cells = {}
+    ids = list(ids)
+    for start in range(0, len(ids), 500):
+        rows = conn.execute(select(Artwork.id, *_cell_key())
+                            .where(Artwork.id.in_(ids[start:start + 500])))
+        cells.update((row[0], tuple(row[1:])) for row in rows)
+    return cells
+
+
+def _apply_deltas(conn, deltas):
+    table = FacetCount.__table__
+    for cell, delta in deltas.items():
+        key = dict(zip(CELL_KEY, cell))
+        changed = conn.execute(
+            update(table).where(*(table.c[name] == value for name, value in key.items()))
+            .values(n=table.c.n + delta)
+        ).rowcount
+        if not changed:
+            conn.execute(table.insert().values(**key, n=delta))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _read_cells_before_flush(session, flush_context, instances):
+    # Read the cells of the artworks this flush updates or deletes from the
+    # rows themselves: attribute history lacks old values that were never
+    # loaded (e.g. a change to an expired instance).
+    ids = {obj.id for obj in session.deleted if isinstance(obj, Artwork)}
+    ids |= {obj.id for obj in session.dirty
+            if isinstance(obj, Artwork) and session.is_modified(obj)}
+    ids.discard(None)
+    session.info['facet_cells'] = _cells(session.connection(), ids) if ids else {}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _update_facet_counts(session, flush_context):
+    """Apply this flush's artwork inserts, deletes and facet edits to
+    ``facet_counts`` in the same transaction."""
+    before = session.info.pop('facet_cells', {})
+    written = {obj.id for obj in session.new if isinstance(obj, Artwork)}
+    written |= before.keys() - {obj.id for obj in session.deleted if isinstance(obj, Artwork)}
+    if not (before or written):
+        return
+    after = _cells(session.connection(), written) if written else {}
+    deltas = {}
+    for cells, step in ((before, -1), (after, 1)):
+        for cell in cells.values():
+            deltas[cell] = deltas.get(cell, 0) + step
+    deltas = {cell: delta for cell, delta in deltas.items() if delta}
+    if deltas:
+        _apply_deltas(session.connection(), deltas)
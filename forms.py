@@ -1,8 +1,46 @@
+from flask import url_for
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from markupsafe import Markup, escape
 from wtforms import (StringField, TextAreaField, DateField, DecimalField,
                      SelectField, BooleanField, IntegerField, PasswordField)
 from wtforms.validators import (DataRequired, Optional, URL, Length,
-                                NumberRange, Email, EqualTo)
+                                NumberRange, Email, EqualTo, ValidationError)
+
+
+class LookupWidget:
+    """Typeahead picker: a hidden id input plus a text box that queries
+    /api/lookup/<kind> (wired up in static/js/main.js)."""
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def __call__(self, field, **kwargs):
+        from lookup import resolve
+        label = resolve(self.kind, field.data) if field.data else None
+        css_class = kwargs.pop('class', kwargs.pop('class_', ''))
+        return Markup(
+            f'<div class="lookup" data-lookup-url="{url_for("lookup", kind=self.kind)}">'
+            f'<input type="hidden" id="{field.id}" name="{field.name}" '
+            f'value="{escape(field.data or "")}" data-lookup-id>'
+            f'<input type="text" class="{escape(css_class)}" value="{escape(label or "")}" '
+            f'placeholder="Start typing to search..." autocomplete="off" data-lookup-input>'
+            f'<ul class="lookup-results" hidden></ul>'
+            f'</div>'
+        )
+
+
+class LookupRef:
+    """Validator: the submitted id must resolve through the lookup API."""
+
+    def __init__(self, kind, message=None):
+        self.kind = kind
+        self.message = message
+
+    def __call__(self, form, field):
+        from lookup import resolve
+        if field.data is None or resolve(self.kind, field.data) is None:
+            raise ValidationError(self.message or 'Please choose an entry from the list.')
 
 
 class RegistrationForm(FlaskForm):
@@ -70,7 +108,8 @@ class ArtistForm(FlaskForm):
 
 class ArtworkForm(FlaskForm):
     title = StringField('Title', validators=[DataRequired(), Length(max=200)])
-    artist_id = SelectField('Artist', coerce=int, validators=[DataRequired()])
+    artist_id = IntegerField('Artist', widget=LookupWidget('artists'),
+                             validators=[DataRequired(), LookupRef('artists')])
     medium = StringField('Medium', validators=[Optional(), Length(max=100)])
 
     art_movement = SelectField('Art Movement', choices=[
@@ -154,10 +193,13 @@ class MuseumForm(FlaskForm):
 
 
 class CollectionForm(FlaskForm):
-    museum_id = SelectField('Museum', coerce=int, validators=[DataRequired()])
-    artwork_id = SelectField('Artwork', coerce=int, validators=[DataRequired()])
+    museum_id = IntegerField('Museum', widget=LookupWidget('museums'),
+                             validators=[DataRequired(), LookupRef('museums')])
+    artwork_id = IntegerField('Artwork', widget=LookupWidget('artworks'),
+                              validators=[DataRequired(), LookupRef('artworks')])
     accession_number = StringField('Accession Number',
-                                   validators=[Optional(), Length(max=50)])
+                                   validators=[Optional(), Length(max=50)],
+                                   filters=[lambda value: value.strip() or None if value else None])
 
     acquisition_date = DateField('Acquisition Date', validators=[Optional()], format='%Y-%m-%d')
 
@@ -190,6 +232,12 @@ class CollectionForm(FlaskForm):
     current_value = DecimalField('Current Value ($)',
                                  validators=[Optional(), NumberRange(min=0)], places=2)
 
+    def validate_accession_number(self, field):
+        from models import Collection
+        if (field.data and field.data != field.object_data
+                and Collection.query.filter_by(accession_number=field.data).first()):
+            raise ValidationError('Another collection entry already has this accession number.')
+
 
 class SQLQueryForm(FlaskForm):
     table = SelectField('Table', choices=[
@@ -219,3 +267,16 @@ class SQLQueryForm(FlaskForm):
     order_by = StringField('ORDER BY (optional)', validators=[Optional()])
     limit = IntegerField('LIMIT', default=50,
                          validators=[Optional(), NumberRange(min=1, max=1000)])
+    explain = BooleanField('Explain (show query plan and timings)')
+
+
+class ImportForm(FlaskForm):
+    kind = SelectField('Import into', choices=[
+        ('artists', 'Artists'),
+        ('artworks', 'Artworks'),
+        ('museums', 'Museums'),
+        ('collections', 'Collections')
+    ], validators=[DataRequired()])
+    file = FileField('CSV or JSONL file', validators=[
+        FileRequired(), FileAllowed(['csv', 'jsonl', 'ndjson'], 'CSV or JSONL files only.')
+    ])
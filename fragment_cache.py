@@ -0,0 +1,134 @@
+"""Jinja fragment cache for per-row template output (gallery cards).
+
+    {% cache artwork.id, artwork.updated_at, artwork.artist.updated_at, is_admin %}
+        ... card markup ...
+    {% endcache %}
+
+The rendered HTML is stored under a hash of the template name, the build id
+(``ETAG_SALT``, see conditional.py) and the listed values, which should
+name the row, its ``updated_at`` and that of every related row the fragment
+shows, plus anything about the viewer that changes the markup. Editing any
+of those rows changes the key; stale entries simply age out.
+
+Entries live in a per-process LRU bounded by ``FRAGMENT_CACHE_SIZE``. With
+``FRAGMENT_CACHE_DIR`` set, misses fall through to an ``ai_cache.DiskCache``
+in that directory, which every worker on the host shares.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from ai_cache import DiskCache
+
+
+class FragmentCache:
+    """Bounded LRU of rendered fragments with an optional shared backend."""
+
+    def __init__(self, max_entries=5000, backend=None):
+        self.max_entries = max_entries
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+        html = self.backend.get(key) if self.backend is not None else None
+        if html is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._remember(key, html)
+        with self._lock:
+            self.hits += 1
+        return html
+
+    def set(self, key, html):
+        self._remember(key, html)
+        if self.backend is not None:
+            self.backend.set(key, html)
+
+    def _remember(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def fragment_key(salt, template, parts):
+    digest = hashlib.sha256()
+    for part in (salt, template, *parts):
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class FragmentCacheExtension(Extension):
+    """Adds ``{% cache key, ... %}...{% endcache %}``; a no-op until
+    ``init_app`` attaches a cache to the environment."""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, fragment_cache_salt='')
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        args = [nodes.Const(parser.name), nodes.List(parts)]
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, template, parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = fragment_key(self.environment.fragment_cache_salt, template, parts)
+        html = cache.get(key)
+        if html is None:
+            html = caller()
+            cache.set(key, str(html))
+        return Markup(html)
+
+
+def init_app(app):
+    """Register the ``{% cache %}`` tag and, unless disabled, its cache."""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if not app.config['FRAGMENT_CACHE_ENABLED']:
+        return
+    backend = None
+    if app.config['FRAGMENT_CACHE_DIR']:
+        backend = DiskCache(app.config['FRAGMENT_CACHE_DIR'],
+                            app.config['FRAGMENT_CACHE_MAX_BYTES'],
+                            app.config['FRAGMENT_CACHE_MAX_ENTRIES'])
+    app.jinja_env.fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'], backend)
+    app.jinja_env.fragment_cache_salt = app.config['ETAG_SALT']
@@ -0,0 +1,59 @@
+"""Gunicorn settings: preloaded app, threaded workers.
+
+    gunicorn -c gunicorn.conf.py "museums_app:create_app()"
+
+The app is imported and built once in the master (``preload_app``), so the
+schema bootstrap and the ~0.7 s of imports happen once and workers start by
+forking. Each worker then drops the database connections it inherited and
+starts its job worker threads. Worker counts are overridable with
+``WEB_CONCURRENCY`` and ``GUNICORN_THREADS``.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+preload_app = True
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() + 1, 8)))
+# Requests mostly wait on the database; keep threads (plus the job worker
+# threads) within the SQLAlchemy pool's 5 + 10 overflow connections.
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Recycling is cheap with a preloaded app: a new worker is just a fork.
+max_requests = 2000
+max_requests_jitter = 200
+
+# Metrics from all workers are aggregated through files in this directory
+# (metrics.py). It has to exist before the preloaded app imports
+# prometheus_client, so it is set up here, once: a HUP reload re-reads this
+# file but finds the variable already set.
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = os.path.join(tempfile.gettempdir(),
+                                                          'museum-prometheus')
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    app = server.app.wsgi()
+    from extensions import db
+    from jobs import start_worker
+    with app.app_context():
+        # Pooled connections opened by the master belong to it; close=False
+        # leaves them alone instead of closing the master's sockets.
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if app.config['JOBS_WORKER'] == 'thread':
+        start_worker(app)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,491 @@
+"""Bulk import of artists, artworks, museums and collections from CSV or JSONL.
+
+The upload is parsed as a stream and written in batches of ``batch_size``
+rows, each batch in its own transaction with one ``executemany`` insert.
+Every row is checked the way the edit forms check it: types come from the
+model columns, required fields, lengths, minimums, URLs and choice sets from
+the matching ``forms.py`` form. Rows that fail are listed in the report and
+skipped; the rest of the file still goes in.
+
+References to other rows can be given by id (``artist_id``, ``museum_id``,
+``artwork_id``) or by name (``artist``, ``museum``, ``artwork``, matched
+case-insensitively). They are resolved a batch at a time into in-memory maps
+that are reused for the rest of the file.
+
+Collections are upserted on ``accession_number`` (``ON CONFLICT`` on SQLite
+and Postgres, ``ON DUPLICATE KEY`` on MySQL): a row whose accession number
+already exists updates that entry with the columns present in the file.
+
+Since these are Core writes, each batch also does the bookkeeping the ORM
+listeners would: dashboard counters, table versions and the search index.
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import Boolean, Date, Integer, Numeric, func, inspect, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from wtforms.validators import URL, DataRequired, Length, NumberRange
+from extensions import db
+from forms import ArtistForm, ArtworkForm, MuseumForm, CollectionForm
+from jobs import enqueue
+from models import Artist, Artwork, Museum, Collection, DashboardCounter, bump_versions
+import facets
+import search as search_index
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+# Errors kept for the report; later ones are only counted.
+MAX_REPORTED_ERRORS = 1000
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+# kind -> (model, form whose validators the rows must pass)
+KINDS = {
+    'artists': (Artist, ArtistForm),
+    'artworks': (Artwork, ArtworkForm),
+    'museums': (Museum, MuseumForm),
+    'collections': (Collection, CollectionForm),
+}
+# Columns the app fills in itself.
+SKIPPED_COLUMNS = {'id', 'created_at', 'updated_at', 'ai_description',
+                   'ai_collection_description'}
+# Foreign key column -> (name column accepted instead, model, label column)
+REFERENCES = {
+    'artist_id': ('artist', Artist, Artist.name),
+    'museum_id': ('museum', Museum, Museum.name),
+    'artwork_id': ('artwork', Artwork, Artwork.title),
+}
+UPSERT_KEYS = {'collections': 'accession_number'}
+SEARCH_KINDS = {'artists': 'artist', 'artworks': 'artwork', 'museums': 'museum'}
+
+_TRUE = {'1', 'true', 't', 'yes', 'y', 'on'}
+_FALSE = {'0', 'false', 'f', 'no', 'n', 'off'}
+
+
+def detect_format(filename):
+    """'csv' or 'jsonl' from the file extension, or None."""
+    for suffix, fmt in FORMATS.items():
+        if (filename or '').lower().endswith(suffix):
+            return fmt
+    return None
+
+
+def read_records(stream, fmt):
+    """Yield ``(line, record, error)`` from a binary stream, one row at a
+    time; ``record`` is a dict, or None when ``error`` says why not."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, 'more values than header columns'
+            else:
+                yield reader.line_num, record, None
+        return
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            yield line, None, f'invalid JSON: {e}'
+            continue
+        if isinstance(record, dict):
+            yield line, record, None
+        else:
+            yield line, None, 'expected a JSON object'
+
+
+class _Field:
+    """Parses and checks one importable column, using the model column for
+    the type and the form field's validators for everything else."""
+
+    def __init__(self, column, form_field):
+        kwargs = getattr(form_field, 'kwargs', {})
+        validators = kwargs.get('validators') or []
+        choices = kwargs.get('choices')
+        self.name = column.name
+        self.type = column.type
+        self.required = any(isinstance(v, DataRequired) for v in validators)
+        self.choices = {value for value, _ in choices if value} if choices else None
+        self.max_length = next((v.max for v in validators
+                                if isinstance(v, Length) and v.max != -1),
+                               getattr(column.type, 'length', None))
+        self.minimum = next((v.min for v in validators
+                             if isinstance(v, NumberRange) and v.min is not None), None)
+        self.url = any(isinstance(v, URL) for v in validators)
+        default = column.default
+        self.default = default.arg if default is not None and default.is_scalar else None
+
+    def parse(self, raw):
+        if isinstance(raw, str):
+            raw = raw.strip()
+        if raw is None or raw == '':
+            if self.required:
+                raise ValueError('is required')
+            return self.default
+        if isinstance(self.type, Boolean):
+            value = self._boolean(raw)
+        elif isinstance(self.type, Date):
+            try:
+                value = datetime.strptime(str(raw), '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f'{raw!r} is not a YYYY-MM-DD date') from None
+        elif isinstance(self.type, Numeric):
+            value = self._decimal(raw)
+        elif isinstance(self.type, Integer):
+            if isinstance(raw, bool):
+                raise ValueError(f'{raw!r} is not a whole number')
+            try:
+                value = int(raw)
+            except (TypeError, ValueError):
+                raise ValueError(f'{raw!r} is not a whole number') from None
+        else:
+            value = str(raw)
+        self._check(value)
+        return value
+
+    def _boolean(self, raw):
+        if isinstance(raw, bool):
+            return raw
+        text = str(raw).lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+        raise ValueError(f'{raw!r} is not yes/no')
+
+    def _decimal(self, raw):
+        if isinstance(raw, bool):
+            raise ValueError(f'{raw!r} is not a number')
+        try:
+            value = Decimal(str(raw))
+        except InvalidOperation:
+            raise ValueError(f'{raw!r} is not a number') from None
+        if not value.is_finite():
+            raise ValueError(f'{raw!r} is not a number')
+        precision, scale = self.type.precision, self.type.scale
+        if precision is not None and abs(value) >= 10 ** (precision - (scale or 0)):
+            raise ValueError(f'{raw} is too large')
+        return value
+
+    def _check(self, value):
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f'{value!r} is not one of: {", ".join(sorted(self.choices))}')
+        if self.max_length and isinstance(value, str) and len(value) > self.max_length:
+            raise ValueError(f'is longer than {self.max_length} characters')
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f'must be at least {self.minimum}')
+        if self.url and not value.startswith(('http://', 'https://')):
+            raise ValueError(f'{value!r} is not an http(s) URL')
+
+
+class _Lookup:
+    """Existing rows referenced by id or by case-insensitive name, loaded a
+    batch at a time and remembered for the rest of the import."""
+
+    def __init__(self, model, label):
+        self.model = model
+        self.label = label
+        self.ids = {}
+        self.names = {}
+
+    def load(self, conn, ids, names, chunk_size=500):
+        ids = sorted({i for i in ids if i not in self.ids})
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            found = set(conn.execute(
+                select(self.model.id).where(self.model.id.in_(chunk))).scalars())
+            self.ids.update({i: i in found for i in chunk})
+        names = sorted({n.lower() for n in names} - self.names.keys())
+        key = func.lower(self.label)
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            for name in chunk:
+                self.names[name] = []
+            for name, row_id in conn.execute(
+                    select(key, self.model.id).where(key.in_(chunk)).order_by(self.model.id)):
+                self.names.setdefault(name, []).append(row_id)
+
+    def resolve(self, kind, value):
+        """Return the id for ``(kind, value)``, or raise ValueError."""
+        if kind == 'id':
+            if not self.ids.get(value):
+                raise ValueError(f'no row with id {value}')
+            return value
+        matches = self.names.get(value.lower(), [])
+        if not matches:
+            raise ValueError(f'nothing named {value!r}')
+        if len(matches) > 1:
+            raise ValueError(f'{len(matches)} rows are named {value!r}; give the id instead')
+        return matches[0]
+
+
+class ImportReport:
+    """Outcome of one import: row counts and per-row errors."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def failed(self):
+        return self.rows - self.inserted - self.updated
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def write_errors(self, fileobj):
+        writer = csv.writer(fileobj)
+        writer.writerow(['line', 'error'])
+        writer.writerows(self.errors)
+
+
+class Importer:
+    """Validates and writes rows of one kind; see the module docstring."""
+
+    def __init__(self, kind, batch_size=BATCH_SIZE):
+        self.kind = kind
+        model, form = KINDS[kind]
+        self.table = model.__table__
+        self.batch_size = batch_size
+        self.fields = {c.name: _Field(c, getattr(form, c.name, None))
+                       for c in self.table.columns if c.name not in SKIPPED_COLUMNS}
+        self.lookups = {column: _Lookup(ref_model, label)
+                        for column, (_, ref_model, label) in REFERENCES.items()
+                        if column in self.fields}
+        self.upsert_key = UPSERT_KEYS.get(kind)
+        self.report = ImportReport(kind)
+        self.museum_ids = set()
+        self._seen_keys = {}
+
+    def check_header(self, header):
+        """Return a file-level problem with a CSV header, or None."""
+        header = {h.strip() for h in header if h}
+        missing = []
+        for name, field in self.fields.items():
+            alias = REFERENCES.get(name, (None,))[0]
+            if field.required and name not in header and alias not in header:
+                missing.append(f'{name} (or {alias})' if alias else name)
+        if missing:
+            return f'missing required column(s): {", ".join(missing)}'
+        return None
+
+    def check_schema(self):
+        """Return a database-level problem that would fail every batch, or None."""
+        if self.upsert_key:
+            indexes = inspect(db.engine).get_indexes(self.table.name)
+            if not any(ix['unique'] and ix['column_names'] == [self.upsert_key]
+                       for ix in indexes):
+                return (f'{self.table.name}.{self.upsert_key} has no unique index; '
+                        f'run "flask db upgrade" first')
+        return None
+
+    def run(self, records):
+        """Import ``(line, record, error)`` tuples from ``read_records``."""
+        started = time.perf_counter()
+        batch = []
+        for line, record, error in records:
+            self.report.rows += 1
+            if error:
+                self.report.add_error(line, error)
+                continue
+            parsed = self._parse(line, record)
+            if parsed is not None:
+                batch.append(parsed)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        self.report.errors.sort(key=lambda error: error[0] or 0)
+        self.report.elapsed = time.perf_counter() - started
+        logger.info(f"Imported {self.kind}: {self.report.inserted} inserted, "
+                    f"{self.report.updated} updated, {self.report.error_count} errors "
+                    f"in {self.report.elapsed:.1f}s")
+        return self.report
+
+    def _parse(self, line, record):
+        """Return ``(line, values, references)`` or None after reporting errors."""
+        record = {(k or '').strip(): v for k, v in record.items()}
+        values, references, errors = {}, {}, []
+        for name, field in self.fields.items():
+            alias = REFERENCES.get(name, (None,))[0]
+            if alias and record.get(name) in (None, '') and record.get(alias) not in (None, ''):
+                label = str(record[alias]).strip()
+                references[name] = ('name', label)
+                continue
+            if name not in record and not field.required:
+                continue
+            try:
+                values[name] = field.parse(record.get(name))
+            except ValueError as e:
+                errors.append(f'{name}: {e}')
+                continue
+            if name in self.lookups and values[name] is not None:
+                references[name] = ('id', values.pop(name))
+        for error in errors:
+            self.report.add_error(line, error)
+        return None if errors else (line, values, references)
+
+    def _resolve(self, conn, batch):
+        for column, lookup in self.lookups.items():
+            refs = [refs[column] for _, _, refs in batch if column in refs]
+            lookup.load(conn, ids=[v for k, v in refs if k == 'id'],
+                        names=[v for k, v in refs if k == 'name'])
+        resolved = []
+        for line, values, refs in batch:
+            try:
+                for column, (kind, value) in refs.items():
+                    values[column] = self.lookups[column].resolve(kind, value)
+            except ValueError as e:
+                self.report.add_error(line, f'{REFERENCES[column][0]}: {e}')
+                continue
+            # One statement can't upsert the same key twice, and a later
+            # row silently overwriting an earlier one is rarely intended.
+            key = values.get(self.upsert_key) if self.upsert_key else None
+            if key is not None:
+                if key in self._seen_keys:
+                    self.report.add_error(line, f'{self.upsert_key}: {key!r} already appears '
+                                                f'on line {self._seen_keys[key]}')
+                    continue
+                self._seen_keys[key] = line
+            resolved.append((line, values))
+        return resolved
+
+    def _flush(self, batch):
+        with db.engine.connect() as conn:
+            rows = self._resolve(conn, batch)
+        if not rows:
+            return
+        params = [values for _, values in rows]
+        try:
+            self._write(params)
+        except DBAPIError as e:
+            logger.warning(f"Import batch of {len(params)} {self.kind} failed ({e.orig}); "
+                           f"retrying row by row")
+            for (line, _), row in zip(rows, params):
+                try:
+                    self._write([row])
+                except DBAPIError as row_error:
+                    self.report.add_error(line, str(row_error.orig).splitlines()[0])
+
+    def _write(self, params):
+        """Write ``params`` plus the matching bookkeeping in one transaction."""
+        with db.engine.begin() as conn:
+            updated = 0
+            if self.upsert_key:
+                keys = [p[self.upsert_key] for p in params if p.get(self.upsert_key)]
+                if keys:
+                    column = self.table.c[self.upsert_key]
+                    updated = len(conn.execute(
+                        select(column).where(column.in_(keys))).all())
+            # executemany needs one key set per statement. A column missing
+            # from a row is left to its default on insert and untouched by
+            # an upsert; CSV rows all share the header's columns.
+            groups = {}
+            for row in params:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            search_kind = SEARCH_KINDS.get(self.kind)
+            returning = (search_kind and search_index.supported(conn)
+                         and conn.dialect.insert_executemany_returning)
+            ids = []
+            for keys, group in groups.items():
+                stmt = self._insert_statement(conn, keys)
+                if returning:
+                    ids += conn.execute(stmt.returning(self.table.c.id), group).scalars()
+                else:
+                    conn.execute(stmt, group)
+            inserted = len(params) - updated
+            counters = DashboardCounter.__table__
+            conn.execute(
+                update(counters)
+                .where(counters.c.id == DashboardCounter.SINGLETON_ID)
+                .values({self.kind: counters.c[self.kind] + inserted})
+            )
+            bump_versions(conn, {self.table.name})
+            if ids:
+                search_index.index_rows(search_kind, ids, conn)
+        self.report.inserted += inserted
+        self.report.updated += updated
+        self.museum_ids.update(p['museum_id'] for p in params if p.get('museum_id'))
+
+    def _insert_statement(self, conn, keys):
+        dialect = conn.dialect.name
+        if not self.upsert_key:
+            return self.table.insert()
+        changed = [k for k in keys if k != self.upsert_key]
+        if 'updated_at' in self.table.c:
+            # Upserts skip Python onupdate defaults; carry the insert's value.
+            changed.append('updated_at')
+        if dialect in ('sqlite', 'postgresql'):
+            stmt = (sqlite if dialect == 'sqlite' else postgresql).insert(self.table)
+            return stmt.on_conflict_do_update(
+                index_elements=[self.upsert_key],
+                set_={k: stmt.excluded[k] for k in changed},
+            )
+        if dialect in ('mysql', 'mariadb'):
+            stmt = mysql.insert(self.table)
+            return stmt.on_duplicate_key_update({k: stmt.inserted[k] for k in changed})
+        raise RuntimeError(f"No upsert support for {dialect}")
+
+
+def import_file(stream, kind, fmt, batch_size=BATCH_SIZE):
+    """Import one file and return its ``ImportReport``."""
+    importer = Importer(kind, batch_size=batch_size)
+    problem = importer.check_schema()
+    if problem:
+        importer.report.add_error(0, problem)
+        return importer.report
+    records = read_records(stream, fmt)
+    if fmt == 'csv':
+        first = next(records, None)
+        if first is None:
+            return importer.report
+        problem = first[1] is not None and importer.check_header(first[1])
+        if problem:
+            importer.report.add_error(1, problem)
+            return importer.report
+        records = _prepend(first, records)
+    try:
+        importer.run(records)
+    except UnicodeDecodeError as e:
+        importer.report.add_error(None, f'file is not valid UTF-8 ({e.reason}); import stopped')
+    _after_import(importer)
+    return importer.report
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+def _after_import(importer):
+    """Work that only needs doing once per file."""
+    if not (importer.report.inserted or importer.report.updated):
+        return
+    if importer.kind == 'artworks':
+        # Upserts bypass the flush listener that maintains facet_counts.
+        facets.rebuild_counts()
+        db.session.commit()
+    if importer.museum_ids:
+        waiting = db.session.execute(
+            select(Museum.id).where(Museum.id.in_(importer.museum_ids),
+                                    Museum.ai_collection_description.is_(None))
+        ).scalars().all()
+        for museum_id in waiting:
+            enqueue('collection_overview', {'museum_id': museum_id},
+                    dedupe_key=f'collection_overview:{museum_id}')
@@ -0,0 +1,204 @@
+"""Explain the queries the list pages run and flag full-table scans.
+
+``flask db-advise`` requests each list URL through the test client (signed
+in as an admin, so login-only pages are covered), records every SELECT the
+request sends, and asks the database for its plan: ``EXPLAIN QUERY PLAN`` on
+SQLite, ``EXPLAIN (FORMAT JSON)`` on Postgres, ``EXPLAIN`` on MySQL. Scans
+of tables with at least ``min_rows`` rows are reported as findings, along
+with sorts that can't be read from an index. A scan that reads rows already
+in ORDER BY order and stops at the LIMIT is not a finding.
+"""
+
+import json
+import re
+import threading
+from sqlalchemy import event, select, text
+from sqlalchemy.exc import DBAPIError
+from extensions import db
+
+DEFAULT_URLS = [
+    '/',
+    '/artists',
+    '/artists?cursor=',
+    '/artworks',
+    '/artworks?cursor=',
+    '/artworks?art_movement=Impressionism',
+    '/artworks?year_from=1800&year_to=1900',
+    '/museums',
+    '/collections',
+    '/collections?cursor=',
+    '/api/lookup/artists?q=a',
+    '/api/lookup/artworks?q=a',
+    '/api/lookup/museums?q=a',
+]
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+# A top-level ORDER BY ... LIMIT closing the statement (no parenthesis
+# between them, so neither belongs to a subquery).
+_ORDERED_LIMIT = re.compile(r'\bORDER BY\b[^()]*\bLIMIT\b', re.IGNORECASE)
+
+
+class Finding:
+    """One plan step worth a look: a full scan or a sort without an index."""
+
+    def __init__(self, kind, table, rows, detail):
+        self.kind = kind
+        self.table = table
+        self.rows = rows
+        self.detail = detail
+
+    def __str__(self):
+        where = ''
+        if self.table:
+            size = '?' if self.rows is None else self.rows
+            where = f" of {self.table} (~{size} rows)"
+        return f"{self.kind}{where}: {self.detail}"
+
+
+def capture_queries(app, urls):
+    """Request ``urls`` and return ``[(statement, params, [urls])]`` for the
+    distinct SELECTs they issued, in first-seen order."""
+    from models import User
+    captured = {}
+    current = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # Skip statements from other threads, e.g. the background job worker.
+        if threading.get_ident() != current['thread']:
+            return
+        if statement.lstrip().upper().startswith('SELECT'):
+            entry = captured.setdefault(statement, (parameters, []))
+            if current['url'] not in entry[1]:
+                entry[1].append(current['url'])
+
+    with app.app_context():
+        admin = db.session.execute(
+            select(User.id).where(User.is_admin.is_(True)).limit(1)
+        ).scalar()
+        engine = db.engine
+    client = app.test_client()
+    if admin is not None:
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin)
+            session['_fresh'] = True
+
+    current['thread'] = threading.get_ident()
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for url in urls:
+            current['url'] = url
+            client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return [(statement, params, seen) for statement, (params, seen) in captured.items()]
+
+
+class _RowCounts:
+    """Table sizes, looked up once per table."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._counts = {}
+
+    def __call__(self, table):
+        if table not in self._counts:
+            try:
+                if self.conn.dialect.name == 'postgresql':
+                    count = self.conn.execute(
+                        text("SELECT reltuples::bigint FROM pg_class WHERE relname = :t"),
+                        {'t': table},
+                    ).scalar()
+                else:
+                    quoted = self.conn.dialect.identifier_preparer.quote(table)
+                    count = self.conn.execute(text(f"SELECT count(*) FROM {quoted}")).scalar()
+            except DBAPIError:
+                # Plans can name an alias rather than the table (MySQL does);
+                # an unknown size is always reported.
+                self.conn.rollback()
+                count = None
+            self._counts[table] = None if count is None else max(count, 0)
+        return self._counts[table]
+
+
+def _explain_sqlite(conn, statement, params, row_count):
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params).all()
+    plan = [row[-1] for row in rows]
+    # An outermost SCAN that already yields rows in ORDER BY order (no temp
+    # B-tree) stops after LIMIT rows, e.g. a rowid-ordered page of
+    # collections; only scans that read the whole table are findings.
+    bounded = (rows and rows[0][1] == 0 and _ORDERED_LIMIT.search(statement)
+               and not any(d.startswith('USE TEMP B-TREE FOR ORDER BY') for d in plan))
+    findings = []
+    for index, detail in enumerate(plan):
+        match = _SQLITE_SCAN.match(detail)
+        if match and not (bounded and index == 0):
+            findings.append(Finding('full scan', match.group(1),
+                                    row_count(match.group(1)), detail))
+        elif detail.startswith('USE TEMP B-TREE FOR ORDER BY'):
+            findings.append(Finding('sort', None, None, detail))
+    return plan, findings
+
+
+def _explain_postgres(conn, statement, params, row_count):
+    raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", params).scalar()
+    root = (json.loads(raw) if isinstance(raw, str) else raw)[0]['Plan']
+    plan, findings = [], []
+
+    def walk(node, depth):
+        label = node['Node Type']
+        if node.get('Relation Name'):
+            label += f" on {node['Relation Name']}"
+        plan.append(f"{'  ' * depth}{label} (rows={node.get('Plan Rows')})")
+        if node['Node Type'] == 'Seq Scan':
+            table = node['Relation Name']
+            findings.append(Finding('full scan', table, row_count(table), label))
+        elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+            findings.append(Finding('sort', None, None,
+                                    f"{label} on {', '.join(node.get('Sort Key', []))}"))
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return plan, findings
+
+
+def _explain_mysql(conn, statement, params, row_count):
+    plan, findings = [], []
+    for row in conn.exec_driver_sql(f"EXPLAIN {statement}", params).mappings():
+        plan.append(f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}")
+        if row['type'] == 'ALL' and row['table'] and not row['table'].startswith('<'):
+            findings.append(Finding('full scan', row['table'], row_count(row['table']),
+                                    plan[-1]))
+        if 'filesort' in (row.get('Extra') or ''):
+            findings.append(Finding('sort', None, None, f"{row['table']}: {row['Extra']}"))
+    return plan, findings
+
+
+EXPLAINERS = {
+    'sqlite': _explain_sqlite,
+    'postgresql': _explain_postgres,
+    'mysql': _explain_mysql,
+}
+
+
+def advise(app, urls=None, min_rows=1000):
+    """Return one report dict per captured statement.
+
+    Each has ``statement``, ``urls``, ``plan`` (lines) and ``findings``: full
+    scans of tables with at least ``min_rows`` rows, and in-memory sorts.
+    """
+    queries = capture_queries(app, urls or DEFAULT_URLS)
+    reports = []
+    with app.app_context():
+        explain = EXPLAINERS.get(db.engine.dialect.name)
+        if explain is None:
+            raise RuntimeError(f"No EXPLAIN support for {db.engine.dialect.name}")
+        with db.engine.connect() as conn:
+            row_count = _RowCounts(conn)
+            for statement, params, seen in queries:
+                plan, findings = explain(conn, statement, params, row_count)
+                findings = [f for f in findings
+                            if f.kind != 'full scan' or f.rows is None or f.rows >= min_rows]
+                reports.append({'statement': statement, 'urls': seen,
+                                'plan': plan, 'findings': findings})
+    return reports
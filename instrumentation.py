@@ -0,0 +1,100 @@
+"""Per-request timing: database, template rendering and AI calls.
+
+Cursor events count statements and sum their execution time, template
+signals time Jinja rendering, and ``ai_service.invoke_model`` reports model
+calls through ``record``. Totals are kept on ``flask.g`` and sent back in a
+``Server-Timing`` header, which browser dev tools show in the network panel:
+
+    Server-Timing: db;dur=12.4;desc="7 queries", render;dur=3.1, ai;dur=0.0, total;dur=18.9
+
+``db`` is time spent in the driver's ``execute``. Drivers that produce rows
+lazily (SQLite, server-side cursors) do part of a large query's work while
+rows are fetched; that part lands in ``total`` but not ``db``. Render time
+includes any queries a template triggers (lazy relationships). Streamed
+responses (CSV exports) only report the work done before the first byte,
+since the header is sent then.
+
+Any statement slower than ``SLOW_QUERY_MS`` is logged with its SQL and the
+route (or background thread) that issued it.
+"""
+
+import logging
+import re
+import threading
+import time
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+TIMINGS = ('db', 'render', 'ai')
+
+
+def record(name, seconds):
+    """Add ``seconds`` to this request's ``name`` timing (no-op outside a request)."""
+    if has_request_context() and 'timings' in g:
+        g.timings[name] = g.timings.get(name, 0.0) + seconds
+
+
+def _caller():
+    if has_request_context():
+        return f"{request.method} {request.path} ({request.endpoint})"
+    return f"thread {threading.current_thread().name}"
+
+
+def init_app(app):
+    """Register the cursor listeners, template signals and request hooks."""
+    slow_ms = app.config['SLOW_QUERY_MS']
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if has_request_context() and 'timings' in g:
+            g.query_count += 1
+            g.timings['db'] += elapsed
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            sql = re.sub(r'\s+', ' ', statement).strip()
+            logger.warning(f"Slow query ({elapsed * 1000:.0f} ms) from {_caller()}: {sql}")
+
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute.
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started:
+            started.pop()
+
+    with app.app_context():
+        engines = list(db.engines.values())  # primary and read replica
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(engine, 'handle_error', handle_error)
+
+    def render_started(sender, template, context, **extra):
+        g.render_started = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        started = g.pop('render_started', None)
+        if started is not None:
+            record('render', time.perf_counter() - started)
+
+    # weak=False: the receivers are closures that would otherwise be collected.
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+    @app.before_request
+    def start_request_timing():
+        g.request_started = time.perf_counter()
+        g.query_count = 0
+        g.timings = dict.fromkeys(TIMINGS, 0.0)
+
+    @app.after_request
+    def add_server_timing(response):
+        if app.config['SERVER_TIMING'] and 'timings' in g:
+            parts = [f'db;dur={g.timings["db"] * 1000:.1f};desc="{g.query_count} queries"']
+            parts += [f'{name};dur={g.timings[name] * 1000:.1f}' for name in TIMINGS[1:]]
+            parts.append(f'total;dur={(time.perf_counter() - g.request_started) * 1000:.1f}')
+            response.headers.add('Server-Timing', ', '.join(parts))
+        return response
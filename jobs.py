@@ -0,0 +1,303 @@
+"""Background job queue backed by the ``jobs`` table.
+
+Slow work (Bedrock calls) is enqueued from a request and run later by a
+worker: either a thread pool inside each web process (``JOBS_WORKER =
+'thread'``) or a separate ``flask jobs work`` process. Workers claim jobs
+with a conditional UPDATE so several processes can share one table, and
+failed jobs are retried with exponential backoff until ``max_attempts``.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import exists, select, update
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import Job, Artist, Artwork, Museum, Collection
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+# Set by enqueue() so an idle in-process worker picks new jobs up at once
+# instead of waiting out its poll interval.
+_wakeup = threading.Event()
+
+
+def job_handler(kind):
+    """Register ``fn(payload)`` as the handler for jobs of ``kind``.
+
+    Handlers run inside an app context and should not commit: the worker
+    commits their changes together with the job's ``done`` status. Raising
+    any exception marks the attempt as failed and schedules a retry.
+    """
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def enqueue(kind, payload=None, dedupe_key=None, max_attempts=None):
+    """Queue a job and return it.
+
+    If ``dedupe_key`` is given and a queued job already carries it, that job
+    is returned instead of creating a duplicate. A running job doesn't count:
+    it may have read its inputs before the change that prompted this call,
+    so a new job is queued behind it (``claim_next`` runs them one at a time).
+    """
+    if dedupe_key:
+        existing = Job.query.filter(
+            Job.dedupe_key == dedupe_key, Job.status == 'queued'
+        ).first()
+        if existing:
+            return existing
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts or current_app.config['JOBS_MAX_ATTEMPTS'],
+    )
+    db.session.add(job)
+    db.session.commit()
+    logger.info(f"Job queued: {kind} (id={job.id})")
+    _wakeup.set()
+    return job
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given number of attempts."""
+    base = current_app.config['JOBS_RETRY_BASE_SECONDS']
+    cap = current_app.config['JOBS_RETRY_MAX_SECONDS']
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.75, 1.25)
+
+
+def requeue_stale():
+    """Return jobs stuck in ``running`` (e.g. their worker died) to the queue."""
+    cutoff = _utcnow() - timedelta(seconds=current_app.config['JOBS_STALE_SECONDS'])
+    count = db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.started_at < cutoff)
+        .values(status='queued', run_after=_utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if count:
+        logger.warning(f"Requeued {count} stale running job(s)")
+    return count
+
+
+def claim_next():
+    """Atomically move the next due job to ``running`` and return its id.
+
+    A job whose ``dedupe_key`` matches one that is already running is left
+    in the queue, so at most one job per key runs at a time. They are
+    filtered out by the candidate query itself, so however many there are,
+    they can't starve the jobs queued behind them.
+    """
+    now = _utcnow()
+    running = aliased(Job)
+    # NULL keys never compare equal, so jobs without one are never blocked.
+    blocked = exists().where(running.dedupe_key == Job.dedupe_key,
+                             running.status == 'running')
+    while True:
+        candidate = db.session.execute(
+            select(Job.id, Job.dedupe_key)
+            .where(Job.status == 'queued', Job.run_after <= now, ~blocked)
+            .order_by(Job.run_after, Job.id)
+            .limit(1)
+        ).first()
+        if candidate is None:
+            break
+        job_id, dedupe_key = candidate
+        # Re-checked in the UPDATE: another worker may have claimed the job,
+        # or one with the same key, since the SELECT. Losing that race just
+        # means looking again.
+        stmt = update(Job).where(Job.id == job_id, Job.status == 'queued')
+        if dedupe_key:
+            # MySQL refuses an UPDATE whose subquery reads the updated table
+            # (error 1093) unless that read is a materialized derived table;
+            # the LIMIT keeps the optimizer from merging it back in.
+            busy = (select(running.id)
+                    .where(running.dedupe_key == dedupe_key, running.status == 'running')
+                    .limit(1).subquery())
+            stmt = stmt.where(~exists(select(busy.c.id)))
+        claimed = db.session.execute(
+            stmt.values(status='running', attempts=Job.attempts + 1, started_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed:
+            db.session.commit()
+            return job_id
+    db.session.commit()
+    return None
+
+
+def run_job(job_id):
+    """Run a claimed job's handler and record success, retry or failure."""
+    job = db.session.get(Job, job_id)
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        handler(json.loads(job.payload))
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = str(e)
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = _utcnow()
+            logger.error(f"Job {job.kind} (id={job_id}) failed permanently: {e}")
+        else:
+            delay = retry_delay(job.attempts)
+            job.status = 'queued'
+            job.run_after = _utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Job {job.kind} (id={job_id}) attempt {job.attempts} "
+                           f"failed, retrying in {delay:.1f}s: {e}")
+        db.session.commit()
+        return False
+    job.status = 'done'
+    job.last_error = None
+    job.finished_at = _utcnow()
+    db.session.commit()
+    logger.info(f"Job {job.kind} (id={job_id}) done")
+    return True
+
+
+def run_pending(limit=None):
+    """Run due jobs synchronously until the queue is empty; return the count."""
+    ran = 0
+    while limit is None or ran < limit:
+        job_id = claim_next()
+        if job_id is None:
+            break
+        run_job(job_id)
+        ran += 1
+    return ran
+
+
+class JobWorker:
+    """Polls the jobs table and runs claimed jobs on a bounded thread pool."""
+
+    def __init__(self, app, threads, poll_interval):
+        self.app = app
+        self.poll_interval = poll_interval
+        self._slots = threading.Semaphore(threads)
+        self._executor = ThreadPoolExecutor(max_workers=threads,
+                                            thread_name_prefix='job-worker')
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='job-poller',
+                                        daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def stop(self, wait=True):
+        self._stop.set()
+        _wakeup.set()
+        self._executor.shutdown(wait=wait)
+
+    def _loop(self):
+        with self.app.app_context():
+            self._safely(requeue_stale)
+        while not self._stop.is_set():
+            if not self._slots.acquire(timeout=self.poll_interval):
+                continue
+            with self.app.app_context():
+                job_id = self._safely(claim_next)
+            if job_id is not None:
+                self._executor.submit(self._run, job_id)
+                continue
+            self._slots.release()
+            _wakeup.wait(self.poll_interval)
+            _wakeup.clear()
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                self._safely(run_job, job_id)
+        finally:
+            self._slots.release()
+
+    def _safely(self, fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            logger.exception(f"Job worker error in {fn.__name__}: {e}")
+            db.session.rollback()
+            return None
+
+
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def start_worker(app):
+    """Start this process's in-process worker once (again after a fork)."""
+    global _worker, _worker_pid
+    if _worker is not None and _worker_pid == os.getpid():
+        return _worker
+    with _worker_lock:
+        if _worker is None or _worker_pid != os.getpid():
+            _worker = JobWorker(
+                app,
+                threads=app.config['JOBS_WORKER_THREADS'],
+                poll_interval=app.config['JOBS_POLL_INTERVAL'],
+            ).start()
+            _worker_pid = os.getpid()
+            logger.info(f"Started in-process job worker (pid={_worker_pid})")
+    return _worker
+
+
+# --- Handlers ---
+
+@job_handler('artwork_description')
+def _generate_artwork_description(payload):
+    from ai_service import generate_artwork_description
+    artwork = db.session.get(Artwork, payload['artwork_id'])
+    if artwork is None:
+        logger.info(f"Artwork id={payload['artwork_id']} gone; skipping description")
+        return
+    description = generate_artwork_description(artwork)
+    if not description:
+        raise RuntimeError('Description generation failed')
+    artwork.ai_description = description
+
+
+COLLECTION_OVERVIEW_MIN_ARTWORKS = 5
+
+
+@job_handler('collection_overview')
+def _generate_collection_overview(payload):
+    from ai_service import generate_collection_description
+    museum = db.session.get(Museum, payload['museum_id'])
+    if museum is None or museum.ai_collection_description:
+        return
+    artworks = db.session.execute(
+        select(Artwork.title, Artwork.medium, Artwork.art_movement,
+               Artist.name.label('artist_name'))
+        .join(Collection, Collection.artwork_id == Artwork.id)
+        .outerjoin(Artist, Artwork.artist_id == Artist.id)
+        .where(Collection.museum_id == museum.id)
+        .order_by(Collection.id)
+    ).all()
+    if len(artworks) < COLLECTION_OVERVIEW_MIN_ARTWORKS:
+        return
+    description = generate_collection_description(museum, artworks)
+    if not description:
+        raise RuntimeError('Collection description generation failed')
+    museum.ai_collection_description = description
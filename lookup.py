@@ -0,0 +1,54 @@
+"""Prefix lookup for typeahead pickers.
+
+The artwork and collection forms used to ship every artist, artwork and
+museum as ``<select>`` options. They now search this module through
+``/api/lookup/<kind>``, which answers with the top N case-insensitive prefix
+matches from an index on ``lower(<label column>)``, and validate submitted ids
+with ``resolve``.
+"""
+
+from sqlalchemy import func, select
+from extensions import db
+from models import Artist, Artwork, Museum
+
+# kind -> (model, label column)
+LOOKUPS = {
+    'artists': (Artist, Artist.name),
+    'artworks': (Artwork, Artwork.title),
+    'museums': (Museum, Museum.name),
+}
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def search(kind, query, limit=DEFAULT_LIMIT):
+    """Return up to ``limit`` ``{'id', 'label'}`` dicts whose label starts with
+    ``query`` (case-insensitive), ordered by label.
+
+    Written as a range on ``lower(label)`` rather than ``LIKE 'q%'`` so the
+    expression index is used regardless of the backend's LIKE rules.
+    """
+    model, label = LOOKUPS[kind]
+    limit = max(1, min(limit, MAX_LIMIT))
+    prefix = (query or '').strip().lower()
+    key = func.lower(label)
+    stmt = select(model.id, label).order_by(key, model.id).limit(limit)
+    if prefix:
+        stmt = stmt.where(key >= prefix, key < _prefix_upper_bound(prefix))
+    return [{'id': row_id, 'label': text} for row_id, text in db.session.execute(stmt)]
+
+
+def resolve(kind, row_id):
+    """Return the label for ``row_id``, or None if no such row exists."""
+    model, label = LOOKUPS[kind]
+    try:
+        row_id = int(row_id)
+    except (TypeError, ValueError):
+        return None
+    return db.session.execute(select(label).where(model.id == row_id)).scalar()
@@ -0,0 +1,111 @@
+"""Prometheus metrics: request latency, database pool usage and AI calls.
+
+Served from ``/metrics`` in the text exposition format. Under gunicorn each
+worker is a separate process, so set ``PROMETHEUS_MULTIPROC_DIR`` to an
+empty, writable directory before the app starts (it must be set before
+``prometheus_client`` is imported). Every process then writes its samples to
+memory-mapped files there and a scrape of any worker aggregates all of
+them. Clear the directory when the server (re)starts, and have gunicorn's
+``child_exit`` hook call ``mark_process_dead(worker.pid)`` so gauges from
+exited workers are dropped. Without the variable, metrics cover only the
+process that answers the scrape.
+"""
+
+import os
+import time
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Gauge, Histogram, generate_latest, multiprocess)
+from sqlalchemy import event
+from extensions import db
+
+REQUEST_LATENCY = Histogram(
+    'museum_request_duration_seconds', 'Request latency by Flask endpoint.',
+    ['endpoint', 'method'],
+)
+REQUESTS = Counter(
+    'museum_requests_total', 'Requests by Flask endpoint and status code.',
+    ['endpoint', 'method', 'status'],
+)
+# Pool metrics are labelled by bind: 'primary' or a SQLALCHEMY_BINDS key
+# such as 'replica'.
+DB_CHECKOUTS = Counter(
+    'museum_db_pool_checkouts_total', 'Connections checked out of the SQLAlchemy pool.',
+    ['bind'],
+)
+DB_CHECKED_OUT = Gauge(
+    'museum_db_pool_checked_out', 'Connections currently checked out.',
+    ['bind'], multiprocess_mode='livesum',
+)
+DB_OVERFLOW = Gauge(
+    'museum_db_pool_overflow', 'Connections open beyond pool_size (negative: unused pool slots).',
+    ['bind'], multiprocess_mode='livesum',
+)
+DB_POOL_SIZE = Gauge(
+    'museum_db_pool_size', 'Configured pool size per process.',
+    ['bind'], multiprocess_mode='livesum',
+)
+AI_LATENCY = Histogram(
+    'museum_ai_call_duration_seconds', 'Model call latency (cache hits excluded).',
+    ['provider'], buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+AI_ERRORS = Counter(
+    'museum_ai_call_errors_total', 'Failed model calls by error code.',
+    ['provider', 'error'],
+)
+
+
+def observe_ai_call(provider, seconds, error=None):
+    AI_LATENCY.labels(provider).observe(seconds)
+    if error:
+        AI_ERRORS.labels(provider, error).inc()
+
+
+def _pool_listeners(pool, bind):
+    def update(*args):
+        # Set on use rather than at startup: with a preloaded app, values set
+        # before the fork belong to the gunicorn master, not the workers.
+        DB_CHECKED_OUT.labels(bind).set(pool.checkedout())
+        if hasattr(pool, 'overflow'):
+            DB_OVERFLOW.labels(bind).set(pool.overflow())
+        if hasattr(pool, 'size'):
+            DB_POOL_SIZE.labels(bind).set(pool.size())
+
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_CHECKOUTS.labels(bind).inc()
+        update()
+
+    event.listen(pool, 'checkout', checkout)
+    event.listen(pool, 'checkin', update)
+
+
+def render():
+    """Return (body, content type) for a scrape."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app):
+    """Register the request hooks and pool listeners."""
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _pool_listeners(engine.pool, bind or 'primary')
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Unmatched URLs share one label so 404 scans can't create
+            # unbounded series.
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+            REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        return response
@@ -0,0 +1,162 @@
+"""Baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+Every table as ``db.create_all()`` has been creating it, without the
+performance indexes (added in 0002). Tables are created only if missing, so
+databases bootstrapped by ``create_all()`` can simply run
+``flask db upgrade``.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=80), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('password_hash', sa.String(length=256), nullable=False),
+    sa.Column('is_admin', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username'),
+    if_not_exists=True
+    )
+    op.create_table('artists',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('birth_date', sa.Date(), nullable=True),
+    sa.Column('death_date', sa.Date(), nullable=True),
+    sa.Column('is_living', sa.Boolean(), nullable=True),
+    sa.Column('birth_place', sa.String(length=100), nullable=True),
+    sa.Column('death_place', sa.String(length=100), nullable=True),
+    sa.Column('nationality', sa.String(length=100), nullable=True),
+    sa.Column('art_movement', sa.String(length=100), nullable=True),
+    sa.Column('primary_medium', sa.String(length=100), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('website', sa.String(length=255), nullable=True),
+    sa.Column('image_url', sa.String(length=255), nullable=True),
+    sa.Column('instagram', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_table('museums',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('museum_type', sa.String(length=50), nullable=True),
+    sa.Column('address', sa.String(length=200), nullable=True),
+    sa.Column('city', sa.String(length=100), nullable=False),
+    sa.Column('state_province', sa.String(length=100), nullable=True),
+    sa.Column('country', sa.String(length=100), nullable=False),
+    sa.Column('postal_code', sa.String(length=20), nullable=True),
+    sa.Column('established_date', sa.Date(), nullable=True),
+    sa.Column('website', sa.String(length=200), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('email', sa.String(length=100), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('annual_visitors', sa.Integer(), nullable=True),
+    sa.Column('admission_fee', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('ai_collection_description', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_table('artworks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=True),
+    sa.Column('medium', sa.String(length=100), nullable=True),
+    sa.Column('art_movement', sa.String(length=100), nullable=True),
+    sa.Column('subject', sa.String(length=100), nullable=True),
+    sa.Column('creation_date', sa.Date(), nullable=True),
+    sa.Column('dimension_H', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('dimension_W', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('dimension_D', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('dimension_unit', sa.String(length=20), nullable=True),
+    sa.Column('weight', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('weight_unit', sa.String(length=20), nullable=True),
+    sa.Column('estimated_value', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('image_url', sa.String(length=255), nullable=True),
+    sa.Column('is_signed', sa.Boolean(), nullable=True),
+    sa.Column('signature_location', sa.String(length=100), nullable=True),
+    sa.Column('ai_description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['artist_id'], ['artists.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_table('collections',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('museum_id', sa.Integer(), nullable=False),
+    sa.Column('artwork_id', sa.Integer(), nullable=False),
+    sa.Column('accession_number', sa.String(length=50), nullable=True),
+    sa.Column('acquisition_date', sa.Date(), nullable=True),
+    sa.Column('acquisition_method', sa.String(length=50), nullable=False),
+    sa.Column('acquisition_cost', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('acquisition_details', sa.Text(), nullable=True),
+    sa.Column('donor_name', sa.String(length=200), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('gallery_location', sa.String(length=100), nullable=True),
+    sa.Column('on_display', sa.Boolean(), nullable=True),
+    sa.Column('current_value', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.ForeignKeyConstraint(['artwork_id'], ['artworks.id'], ),
+    sa.ForeignKeyConstraint(['museum_id'], ['museums.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('dedupe_key', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    existing = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes('jobs')}
+    if 'ix_jobs_dedupe_key' not in existing:
+        op.create_index(op.f('ix_jobs_dedupe_key'), 'jobs', ['dedupe_key'], unique=False)
+    if 'ix_jobs_status' not in existing:
+        op.create_index(op.f('ix_jobs_status'), 'jobs', ['status'], unique=False)
+    op.create_table('dashboard_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('artists', sa.Integer(), nullable=False),
+    sa.Column('artworks', sa.Integer(), nullable=False),
+    sa.Column('museums', sa.Integer(), nullable=False),
+    sa.Column('collections', sa.Integer(), nullable=False),
+    sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('dashboard_counters')
+    op.drop_index(op.f('ix_jobs_status'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_dedupe_key'), table_name='jobs')
+    op.drop_table('jobs')
+    op.drop_table('collections')
+    op.drop_table('artworks')
+    op.drop_table('museums')
+    op.drop_table('artists')
+    op.drop_table('users')
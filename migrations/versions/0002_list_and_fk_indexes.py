@@ -0,0 +1,75 @@
+"""Indexes for foreign keys, list ordering, lookups and facets
+
+Revision ID: 0002_list_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:30:00.000000
+
+Foreign-key columns used in joins, the sort keys of the list pages (with
+the id tiebreaker), the lower() expression indexes behind the typeahead
+lookups, and the composite artwork facet indexes. ``create_all()`` never
+adds indexes to tables that already exist, so older databases only get
+these through this migration.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_list_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # (name, table, columns)
+    ('ix_artworks_artist_id', 'artworks', ['artist_id']),
+    ('ix_collections_artwork_id', 'collections', ['artwork_id']),
+    ('ix_collections_museum_id', 'collections', ['museum_id']),
+    ('ix_artists_name_id', 'artists', ['name', 'id']),
+    ('ix_artworks_title_id', 'artworks', ['title', 'id']),
+    ('ix_museums_name_id', 'museums', ['name', 'id']),
+    ('ix_artworks_created_at', 'artworks', ['created_at']),
+    # Expressions rather than text(): MySQL needs a functional key part in
+    # its own parentheses, which the dialect adds only for expressions.
+    ('ix_artists_name_lower', 'artists', [sa.func.lower(sa.column('name'))]),
+    ('ix_artworks_title_lower', 'artworks', [sa.func.lower(sa.column('title'))]),
+    ('ix_museums_name_lower', 'museums', [sa.func.lower(sa.column('name'))]),
+    ('ix_artworks_movement_title', 'artworks', ['art_movement', 'title', 'id']),
+    ('ix_artworks_medium_title', 'artworks', ['medium', 'title', 'id']),
+    ('ix_artworks_subject_title', 'artworks', ['subject', 'title', 'id']),
+    ('ix_artworks_signed_title', 'artworks', ['is_signed', 'title', 'id']),
+    ('ix_artworks_creation_date', 'artworks', ['creation_date']),
+    ('ix_artworks_estimated_value', 'artworks', ['estimated_value']),
+]
+
+
+def _supports_if_exists(bind):
+    # MySQL (unlike MariaDB) has no CREATE/DROP INDEX IF [NOT] EXISTS.
+    return not (bind.dialect.name == 'mysql' and not bind.dialect.is_mariadb)
+
+
+def _has_index(bind, table, name):
+    return any(ix['name'] == name for ix in sa.inspect(bind).get_indexes(table))
+
+
+def upgrade():
+    bind = op.get_bind()
+    # ``--sql`` runs have no database to inspect; emit every statement.
+    offline = op.get_context().as_sql
+    for name, table, columns in INDEXES:
+        if _supports_if_exists(bind):
+            op.create_index(name, table, columns, unique=False, if_not_exists=True)
+        elif offline or not _has_index(bind, table, name):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    offline = op.get_context().as_sql
+    for name, table, _ in reversed(INDEXES):
+        if _supports_if_exists(bind):
+            op.drop_index(name, table_name=table, if_exists=True)
+        elif offline or _has_index(bind, table, name):
+            op.drop_index(name, table_name=table)
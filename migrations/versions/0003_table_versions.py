@@ -0,0 +1,29 @@
+"""Per-table write versions for cache invalidation
+
+Revision ID: 0003_table_versions
+Revises: 0002_list_indexes
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_table_versions'
+down_revision = '0002_list_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('table_versions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('table_versions')
@@ -0,0 +1,46 @@
+"""Unique index on collections.accession_number
+
+Revision ID: 0004_unique_accession
+Revises: 0003_table_versions
+Create Date: 2026-10-18 18:00:00.000000
+
+Bulk imports upsert collection entries on their accession number. Blank
+accession numbers become NULL first (NULLs never collide); real duplicates
+stop the upgrade with a list to fix by hand.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_unique_accession'
+down_revision = '0003_table_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    bind.execute(sa.text(
+        "UPDATE collections SET accession_number = NULL "
+        "WHERE TRIM(accession_number) = ''"
+    ))
+    duplicates = bind.execute(sa.text(
+        "SELECT accession_number, COUNT(*) FROM collections "
+        "WHERE accession_number IS NOT NULL "
+        "GROUP BY accession_number HAVING COUNT(*) > 1 "
+        "ORDER BY accession_number LIMIT 20"
+    )).all()
+    if duplicates:
+        listed = ', '.join(f'{number!r} ({n} rows)' for number, n in duplicates)
+        raise RuntimeError(f"Duplicate collections.accession_number values: {listed}")
+    if any(ix['name'] == 'ix_collections_accession_number'
+           for ix in sa.inspect(bind).get_indexes('collections')):
+        return
+    op.create_index('ix_collections_accession_number', 'collections',
+                    ['accession_number'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_collections_accession_number', table_name='collections')
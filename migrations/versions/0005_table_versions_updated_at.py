@@ -0,0 +1,29 @@
+"""Last-bump timestamp on table_versions
+
+Revision ID: 0005_table_versions_updated
+Revises: 0004_unique_accession
+Create Date: 2026-10-18 20:00:00.000000
+
+Conditional GET (conditional.py) sends it as Last-Modified. Existing rows
+stay NULL until their table is next written.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_table_versions_updated'
+down_revision = '0004_unique_accession'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('table_versions')}
+    if 'updated_at' not in columns:
+        op.add_column('table_versions', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('table_versions', 'updated_at')
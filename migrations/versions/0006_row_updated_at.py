@@ -0,0 +1,42 @@
+"""updated_at on artists, artworks, museums and collections
+
+Revision ID: 0006_row_updated_at
+Revises: 0005_table_versions_updated
+Create Date: 2026-10-18 21:00:00.000000
+
+Row versions for the template fragment cache. Existing artists and
+artworks start from created_at; museums and collections, which have no
+creation time, stay NULL until their next edit.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_row_updated_at'
+down_revision = '0005_table_versions_updated'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['artists', 'artworks', 'museums', 'collections']
+BACKFILL_FROM_CREATED_AT = ['artists', 'artworks']
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    column_type = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+    for table in TABLES:
+        if 'updated_at' in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        op.add_column(table, sa.Column('updated_at', column_type, nullable=True))
+        if table in BACKFILL_FROM_CREATED_AT:
+            bind.execute(sa.text(f"UPDATE {table} SET updated_at = created_at"))
+
+
+def downgrade():
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
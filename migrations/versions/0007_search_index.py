@@ -0,0 +1,78 @@
+"""Full-text search index table
+
+Revision ID: 0007_search_index
+Revises: 0006_row_updated_at
+Create Date: 2026-10-19 09:00:00.000000
+
+search.py's index (an FTS5 virtual table on SQLite, a table with a
+generated, GIN-indexed tsvector on Postgres) was only created by
+``db.create_all()`` start-ups, so databases built with ``flask db upgrade``
+lacked it and every catalogue insert failed. Created here and filled from
+the source tables when it didn't exist yet; other backends search with
+LIKE and need nothing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_search_index'
+down_revision = '0006_row_updated_at'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "title, body, tokenize = 'porter unicode61')",
+)
+POSTGRES_DDL = (
+    """CREATE TABLE IF NOT EXISTS search_index (
+        doc_id BIGINT PRIMARY KEY,
+        title TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        document TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', title), 'A') ||
+            setweight(to_tsvector('english', body), 'B')
+        ) STORED
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_search_index_document ON search_index USING GIN (document)",
+)
+
+# table, kind code (doc_id = id * 4 + code), title column, body columns
+SOURCES = [
+    ('artworks', 1, 'title', ('description', 'ai_description')),
+    ('artists', 2, 'name', ('bio',)),
+    ('museums', 3, 'name', ('description',)),
+]
+BATCH_SIZE = 2000
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return
+    if sa.inspect(bind).has_table('search_index'):
+        return
+    for ddl in SQLITE_DDL if dialect == 'sqlite' else POSTGRES_DDL:
+        bind.execute(sa.text(ddl))
+
+    key = 'rowid' if dialect == 'sqlite' else 'doc_id'
+    insert = sa.text(f"INSERT INTO search_index ({key}, title, body) "
+                     f"VALUES (:doc_id, :title, :body)")
+    for table, code, title, body in SOURCES:
+        rows = bind.execute(sa.text(
+            f"SELECT id, {title}, {', '.join(body)} FROM {table} ORDER BY id"
+        )).all()
+        for start in range(0, len(rows), BATCH_SIZE):
+            docs = [{'doc_id': r[0] * 4 + code, 'title': r[1] or '',
+                     'body': '\n'.join(filter(None, r[2:]))}
+                    for r in rows[start:start + BATCH_SIZE]]
+            if docs:
+                bind.execute(insert, docs)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS search_index")
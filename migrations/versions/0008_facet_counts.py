@@ -0,0 +1,64 @@
+"""Per-combination artwork counts for the facet sidebar
+
+Revision ID: 0008_facet_counts
+Revises: 0007_search_index
+Create Date: 2026-10-19 14:00:00.000000
+
+facets.py reads its counts from this table instead of grouping the whole
+artworks table. Filled here from the existing artworks; after that the
+session's flush listeners keep it current. The creation_date and
+estimated_value indexes gain the facet columns, so range-filtered counts
+are read from the index alone.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_facet_counts'
+down_revision = '0007_search_index'
+branch_labels = None
+depends_on = None
+
+FACET_COLUMNS = ['art_movement', 'medium', 'subject', 'is_signed']
+RANGE_INDEXES = [
+    ('ix_artworks_creation_date', 'creation_date'),
+    ('ix_artworks_estimated_value', 'estimated_value'),
+]
+
+
+def upgrade():
+    op.create_table('facet_counts',
+    sa.Column('art_movement', sa.String(length=100), nullable=False),
+    sa.Column('medium', sa.String(length=100), nullable=False),
+    sa.Column('subject', sa.String(length=100), nullable=False),
+    sa.Column('is_signed', sa.Boolean(), nullable=False),
+    sa.Column('n', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('art_movement', 'medium', 'subject', 'is_signed'),
+    if_not_exists=True
+    )
+    artworks = sa.table('artworks', sa.column('art_movement'), sa.column('medium'),
+                        sa.column('subject'), sa.column('is_signed', sa.Boolean))
+    key = [
+        sa.func.coalesce(artworks.c.art_movement, sa.literal_column("''")),
+        sa.func.coalesce(artworks.c.medium, sa.literal_column("''")),
+        sa.func.coalesce(artworks.c.subject, sa.literal_column("''")),
+        sa.func.coalesce(artworks.c.is_signed, sa.false()),
+    ]
+    columns = [*FACET_COLUMNS, 'n']
+    counts = sa.table('facet_counts', *(sa.column(name) for name in columns))
+    op.execute(counts.delete())
+    op.execute(counts.insert().from_select(
+        columns, sa.select(*key, sa.func.count()).group_by(*key)))
+
+    for name, column in RANGE_INDEXES:
+        op.drop_index(name, table_name='artworks')
+        op.create_index(name, 'artworks', [column, *FACET_COLUMNS], unique=False)
+
+
+def downgrade():
+    for name, column in RANGE_INDEXES:
+        op.drop_index(name, table_name='artworks')
+        op.create_index(name, 'artworks', [column], unique=False)
+    op.drop_table('facet_counts')
@@ -1,9 +1,21 @@
 from datetime import datetime, timezone
 from flask_login import UserMixin
+from sqlalchemy import event, func, select, update
+from sqlalchemy.dialects import mysql
 from werkzeug.security import generate_password_hash, check_password_hash
 from extensions import db
 
 
+def _now():
+    return datetime.now(timezone.utc)
+
+
+# Row version for the template fragment cache (fragment_cache.py): set on
+# insert and on every ORM or Core UPDATE. Microsecond precision on MySQL too,
+# so two edits within one second still differ.
+UpdatedAt = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
 
@@ -39,6 +51,7 @@ class Artist(db.Model):
     image_url = db.Column(db.String(255), nullable=True)
     instagram = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(UpdatedAt, default=_now, onupdate=_now)
 
     artworks = db.relationship('Artwork', backref='artist', lazy='dynamic')
 
@@ -48,7 +61,7 @@ class Artwork(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=True, index=True)
     medium = db.Column(db.String(100), nullable=True)
     art_movement = db.Column(db.String(100), nullable=True)
     subject = db.Column(db.String(100), nullable=True)
@@ -65,7 +78,8 @@ class Artwork(db.Model):
     is_signed = db.Column(db.Boolean, default=False)
     signature_location = db.Column(db.String(100), nullable=True)
     ai_description = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    updated_at = db.Column(UpdatedAt, default=_now, onupdate=_now)
 
     collections = db.relationship('Collection', backref='artwork', lazy='dynamic')
 
@@ -89,6 +103,7 @@ class Museum(db.Model):
     annual_visitors = db.Column(db.Integer, nullable=True)
     admission_fee = db.Column(db.Numeric(10, 2), nullable=True)
     ai_collection_description = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(UpdatedAt, default=_now, onupdate=_now)
 
     collections = db.relationship('Collection', backref='museum', lazy='dynamic')
 
@@ -97,9 +112,10 @@ class Collection(db.Model):
     __tablename__ = 'collections'
 
     id = db.Column(db.Integer, primary_key=True)
-    museum_id = db.Column(db.Integer, db.ForeignKey('museums.id'), nullable=False)
-    artwork_id = db.Column(db.Integer, db.ForeignKey('artworks.id'), nullable=False)
-    accession_number = db.Column(db.String(50), nullable=True)
+    museum_id = db.Column(db.Integer, db.ForeignKey('museums.id'), nullable=False, index=True)
+    artwork_id = db.Column(db.Integer, db.ForeignKey('artworks.id'), nullable=False, index=True)
+    # Unique so bulk imports can upsert on it (see importer.py)
+    accession_number = db.Column(db.String(50), nullable=True, unique=True, index=True)
     acquisition_date = db.Column(db.Date, nullable=True)
     acquisition_method = db.Column(db.String(50), nullable=False)
     acquisition_cost = db.Column(db.Numeric(12, 2), nullable=True)
@@ -109,3 +125,232 @@ class Collection(db.Model):
     gallery_location = db.Column(db.String(100), nullable=True)
     on_display = db.Column(db.Boolean, default=False)
     current_value = db.Column(db.Numeric(12, 2), nullable=True)
+    updated_at = db.Column(UpdatedAt, default=_now, onupdate=_now)
+
+
+# List-page sort keys, with the primary key as the tiebreaker that
+# pagination.with_tiebreaker appends, so pages are read in index order.
+db.Index('ix_artists_name_id', Artist.name, Artist.id)
+db.Index('ix_artworks_title_id', Artwork.title, Artwork.id)
+db.Index('ix_museums_name_id', Museum.name, Museum.id)
+
+# Case-insensitive prefix indexes backing the typeahead lookups in lookup.py
+db.Index('ix_artists_name_lower', func.lower(Artist.name))
+db.Index('ix_artworks_title_lower', func.lower(Artwork.title))
+db.Index('ix_museums_name_lower', func.lower(Museum.name))
+
+# Artwork facet filters: each facet column leads an index that also carries
+# the list's sort key, so a filtered page is an index range read in title
+# order and each facet's GROUP BY can be answered from the index alone.
+db.Index('ix_artworks_movement_title', Artwork.art_movement, Artwork.title, Artwork.id)
+db.Index('ix_artworks_medium_title', Artwork.medium, Artwork.title, Artwork.id)
+db.Index('ix_artworks_subject_title', Artwork.subject, Artwork.title, Artwork.id)
+db.Index('ix_artworks_signed_title', Artwork.is_signed, Artwork.title, Artwork.id)
+# The range filters' indexes carry the facet columns, so the facet
+# combinations of the artworks in a range are read from the index alone.
+db.Index('ix_artworks_creation_date', Artwork.creation_date, Artwork.art_movement,
+         Artwork.medium, Artwork.subject, Artwork.is_signed)
+db.Index('ix_artworks_estimated_value', Artwork.estimated_value, Artwork.art_movement,
+         Artwork.medium, Artwork.subject, Artwork.is_signed)
+
+
+class Job(db.Model):
+    """A unit of background work, claimed and run by the worker in jobs.py."""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    dedupe_key = db.Column(db.String(100), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class DashboardCounter(db.Model):
+    """Single-row table of catalogue totals shown on the home page.
+
+    Kept current by the ``after_flush`` listener below; bulk statements that
+    bypass the ORM unit of work (``Query.delete()``, Core inserts) leave it
+    stale until ``reconcile()`` runs.
+    """
+    __tablename__ = 'dashboard_counters'
+
+    id = db.Column(db.Integer, primary_key=True)
+    artists = db.Column(db.Integer, nullable=False, default=0)
+    artworks = db.Column(db.Integer, nullable=False, default=0)
+    museums = db.Column(db.Integer, nullable=False, default=0)
+    collections = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime, nullable=True)
+
+    SINGLETON_ID = 1
+
+    @classmethod
+    def current(cls):
+        """Return the counters row, rebuilding it if it doesn't exist yet."""
+        return db.session.get(cls, cls.SINGLETON_ID) or cls.reconcile()
+
+    @classmethod
+    def reconcile(cls):
+        """Recompute every counter from scratch and commit the result."""
+        counts = {
+            column: db.session.execute(
+                select(func.count()).select_from(model.__table__)
+            ).scalar()
+            for model, column in COUNTED_MODELS.items()
+        }
+        row = db.session.get(cls, cls.SINGLETON_ID)
+        if row is None:
+            row = cls(id=cls.SINGLETON_ID)
+            db.session.add(row)
+        for column, value in counts.items():
+            setattr(row, column, value)
+        row.reconciled_at = datetime.now(timezone.utc)
+        db.session.commit()
+        return row
+
+
+COUNTED_MODELS = {
+    Artist: 'artists',
+    Artwork: 'artworks',
+    Museum: 'museums',
+    Collection: 'collections',
+}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _update_dashboard_counters(session, flush_context):
+    """Apply this flush's inserts and deletes to the counters row in the
+    same transaction, so the totals commit or roll back with the data."""
+    deltas = {}
+    for obj, step in [(o, 1) for o in session.new] + [(o, -1) for o in session.deleted]:
+        column = COUNTED_MODELS.get(type(obj))
+        if column:
+            deltas[column] = deltas.get(column, 0) + step
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    counters = DashboardCounter.__table__
+    session.connection().execute(
+        update(counters)
+        .where(counters.c.id == DashboardCounter.SINGLETON_ID)
+        .values({column: counters.c[column] + delta for column, delta in deltas.items()})
+    )
+
+
+class FacetCount(db.Model):
+    """Number of artworks per combination of facet values.
+
+    Kept current by the flush listeners in facets.py; Core writes and bulk
+    statements leave it stale until ``facets.rebuild_counts()`` runs. Missing
+    values are stored as '' (and unsigned) so every column can be part of
+    the primary key.
+    """
+    __tablename__ = 'facet_counts'
+
+    art_movement = db.Column(db.String(100), primary_key=True, default='')
+    medium = db.Column(db.String(100), primary_key=True, default='')
+    subject = db.Column(db.String(100), primary_key=True, default='')
+    is_signed = db.Column(db.Boolean, primary_key=True, default=False)
+    n = db.Column(db.Integer, nullable=False, default=0)
+
+
+class TableVersion(db.Model):
+    """Per-table write counter for cache invalidation.
+
+    Bumped in the writing transaction by the listeners below whenever ORM
+    flushes or ORM bulk statements touch a table in ``VERSIONED_TABLES``;
+    Core writes that bypass the ORM should call ``bump_versions``. A cached
+    value tagged with a table's version is valid while the version matches.
+    """
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Time of the last bump; the Last-Modified of pages built from the table
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+
+VERSIONED_TABLES = {'artists', 'artworks', 'museums', 'collections'}
+
+
+def bump_versions(connection, table_names):
+    """Increment the version of each table in ``table_names`` (creating
+    missing rows) using ``connection``'s current transaction."""
+    names = sorted(set(table_names) & VERSIONED_TABLES)
+    if not names:
+        return
+    versions = TableVersion.__table__
+    now = _now()
+    result = connection.execute(
+        update(versions)
+        .where(versions.c.table_name.in_(names))
+        .values(version=versions.c.version + 1, updated_at=now)
+    )
+    if result.rowcount != len(names):
+        existing = set(connection.execute(
+            select(versions.c.table_name).where(versions.c.table_name.in_(names))
+        ).scalars())
+        missing = [{'table_name': name, 'version': 1, 'updated_at': now}
+                   for name in names if name not in existing]
+        if missing:
+            connection.execute(versions.insert(), missing)
+
+
+def table_versions(table_names, connection=None):
+    """Current ``{table_name: version}``; tables never written report 0."""
+    names = sorted(set(table_names))
+    versions = TableVersion.__table__
+    stmt = select(versions.c.table_name, versions.c.version).where(
+        versions.c.table_name.in_(names))
+    rows = (connection or db.session).execute(stmt).all()
+    return {**dict.fromkeys(names, 0), **dict(rows)}
+
+
+def table_stamps(table_names, connection=None):
+    """Current ``{table_name: (version, updated_at)}`` in one query; tables
+    never written report ``(0, None)``."""
+    names = sorted(set(table_names))
+    versions = TableVersion.__table__
+    stmt = select(versions.c.table_name, versions.c.version, versions.c.updated_at).where(
+        versions.c.table_name.in_(names))
+    rows = (connection or db.session).execute(stmt).all()
+    return {**dict.fromkeys(names, (0, None)),
+            **{name: (version, updated_at) for name, version, updated_at in rows}}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_flushed_table_versions(session, flush_context):
+    tables = {obj.__table__.name
+              for obj in (*session.new, *session.deleted) if hasattr(obj, '__table__')}
+    tables |= {obj.__table__.name for obj in session.dirty
+               if hasattr(obj, '__table__') and session.is_modified(obj)}
+    bump_versions(session.connection(), tables)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _bump_bulk_table_versions(orm_execute_state):
+    """Cover ORM-enabled bulk statements (``session.execute(update(Model),
+    ...)``, ``Query.delete()``) which never reach the flush."""
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            bump_versions(orm_execute_state.session.connection(), {table.name})
@@ -1,15 +1,34 @@
 import logging
-import csv
-import io
 import re
+import uuid
 from functools import wraps
+import click
 from flask import (Flask, render_template, request, redirect, url_for,
-                   flash, send_file, jsonify, abort)
+                   flash, jsonify, abort, Response, stream_with_context, current_app)
+from flask.cli import AppGroup, with_appcontext
 from flask_login import login_user, logout_user, login_required, current_user
+from flask_wtf.csrf import validate_csrf
+from wtforms.validators import ValidationError
+from sqlalchemy import inspect
 from config import config
 from extensions import db, migrate, login_manager
 from forms import (ArtistForm, ArtworkForm, MuseumForm, CollectionForm,
-                   SQLQueryForm, LoginForm, RegistrationForm)
+                   SQLQueryForm, LoginForm, RegistrationForm, ImportForm)
+from query_shapes import shape_query
+from pagination import keyset_paginate, order_clauses, with_tiebreaker
+from exports import iter_csv_rows, gzip_chunks, table_has_rows
+import conditional
+from conditional import conditional_get
+import facets
+import fragment_cache
+import importer
+import instrumentation
+import metrics
+import playground
+import replica
+from replica import read_only
+import search as search_index
+from jobs import enqueue, run_pending, start_worker, JobWorker
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +45,144 @@ def admin_required(f):
     return decorated_function
 
 
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters_command():
+    """Recompute the home-page dashboard counters from the tables."""
+    from models import DashboardCounter
+    row = DashboardCounter.reconcile()
+    click.echo(f"Counters reconciled: {row.artists} artists, {row.artworks} artworks, "
+               f"{row.museums} museums, {row.collections} collection entries")
+
+
+@click.command('db-advise')
+@click.option('--url', 'urls', multiple=True,
+              help='Page to analyse (repeatable; default: every list page).')
+@click.option('--min-rows', default=1000, show_default=True,
+              help='Only flag full scans of tables at least this large.')
+@click.option('--verbose', '-v', is_flag=True, help='Print every plan, not just flagged ones.')
+@click.option('--fail', is_flag=True, help='Exit with status 1 if any full scan is flagged.')
+def db_advise_command(urls, min_rows, verbose, fail):
+    """EXPLAIN the queries the list pages run and flag full-table scans."""
+    from index_advisor import advise
+    reports = advise(current_app._get_current_object(), list(urls) or None, min_rows)
+    scans = 0
+    for report in reports:
+        if not (verbose or report['findings']):
+            continue
+        click.echo(f"\n[{', '.join(report['urls'])}]")
+        click.echo('  ' + ' '.join(report['statement'].split())[:300])
+        for line in report['plan']:
+            click.echo(f"    {line}")
+        for finding in report['findings']:
+            if finding.kind == 'full scan':
+                scans += 1
+            click.secho(f"  ! {finding}", fg='red' if finding.kind == 'full scan' else 'yellow')
+    click.echo(f"\n{len(reports)} distinct queries analysed, {scans} full scan(s) "
+               f"of tables with >= {min_rows} rows")
+    if fail and scans:
+        raise SystemExit(1)
+
+
+jobs_cli = AppGroup('jobs', help='Background job queue commands.')
+
+
+@jobs_cli.command('work')
+@click.option('--threads', type=int, default=None, help='Concurrent jobs (default: JOBS_WORKER_THREADS).')
+def jobs_work_command(threads):
+    """Run a job worker in the foreground until interrupted."""
+    app = current_app._get_current_object()
+    worker = JobWorker(
+        app,
+        threads=threads or app.config['JOBS_WORKER_THREADS'],
+        poll_interval=app.config['JOBS_POLL_INTERVAL'],
+    ).start()
+    click.echo(f"Job worker running with {threads or app.config['JOBS_WORKER_THREADS']} thread(s)")
+    try:
+        while True:
+            worker.join(timeout=1)
+    except KeyboardInterrupt:
+        click.echo("Stopping job worker...")
+        worker.stop()
+
+
+@jobs_cli.command('run-pending')
+def jobs_run_pending_command():
+    """Run every due job once, synchronously, then exit."""
+    ran = run_pending()
+    click.echo(f"Ran {ran} job(s)")
+
+
+ai_cli = AppGroup('ai', help='Bulk AI generation commands.')
+
+
+@ai_cli.command('backfill')
+@click.option('--concurrency', default=4, show_default=True, help='Parallel model calls.')
+@click.option('--rate', default=2.0, show_default=True, help='Max model calls per second.')
+@click.option('--batch-size', default=50, show_default=True, help='Rows per commit.')
+@click.option('--limit', type=int, default=None, help='Stop after this many artworks.')
+@click.option('--checkpoint', 'checkpoint_path', default=None,
+              help='Checkpoint file (default: instance/ai_backfill.checkpoint).')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and start from the first artwork.')
+def ai_backfill_command(concurrency, rate, batch_size, limit, checkpoint_path, restart):
+    """Generate descriptions for every artwork that lacks one."""
+    from ai_backfill import run_backfill
+    stats = run_backfill(
+        current_app._get_current_object(),
+        concurrency=concurrency, rate=rate, batch_size=batch_size, limit=limit,
+        checkpoint_path=checkpoint_path, restart=restart,
+    )
+    click.echo(f"Processed {stats['processed']} artworks (ids {stats['start_id'] + 1}..{stats['last_id']}): "
+               f"{stats['succeeded']} succeeded, {stats['failed']} failed")
+    if stats['checkpoint_id'] != stats['last_id']:
+        click.echo(f"Checkpoint left at id {stats['checkpoint_id']}; the next run retries "
+                   f"the failed artworks")
+    click.echo(f"Throughput: {stats['items_per_second']:.2f} items/sec over {stats['elapsed_seconds']:.1f}s")
+    click.echo(f"Call latency: p50 {stats['p50_latency'] * 1000:.0f} ms, "
+               f"p95 {stats['p95_latency'] * 1000:.0f} ms")
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(list(importer.KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, default=None, help='Rows per transaction (default: IMPORT_BATCH_SIZE).')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False), default=None,
+              help='Write the per-row error report to this CSV file.')
+@with_appcontext
+def import_command(kind, path, batch_size, errors_path):
+    """Import artists, artworks, museums or collections from a CSV/JSONL file."""
+    fmt = importer.detect_format(path)
+    if fmt is None:
+        raise click.UsageError('PATH must end in .csv, .jsonl or .ndjson')
+    with open(path, 'rb') as stream:
+        report = importer.import_file(
+            stream, kind, fmt, batch_size=batch_size or current_app.config['IMPORT_BATCH_SIZE'])
+    for line, message in report.errors[:20]:
+        click.echo(f"  line {line}: {message}")
+    if report.error_count > 20:
+        click.echo(f"  ... and {report.error_count - 20} more")
+    if errors_path and report.errors:
+        with open(errors_path, 'w', newline='') as fileobj:
+            report.write_errors(fileobj)
+        click.echo(f"Error report written to {errors_path}")
+    rate = report.rows / report.elapsed if report.elapsed else 0
+    click.echo(f"{report.rows} rows read: {report.inserted} inserted, {report.updated} updated, "
+               f"{report.error_count} errors ({rate:.0f} rows/sec)")
+
+
+search_cli = AppGroup('search', help='Full-text search index commands.')
+
+
+@search_cli.command('rebuild')
+def search_rebuild_command():
+    """Repopulate the full-text index from the catalogue tables."""
+    if not search_index.supported():
+        click.echo("Full-text search needs SQLite (FTS5) or Postgres; nothing to do.")
+        return
+    search_index.ensure_index()
+    click.echo(f"Indexed {search_index.rebuild_index()} documents")
+
+
 def create_app(config_name=None):
     """Application factory."""
     if config_name is None:
@@ -39,6 +196,12 @@ def create_app(config_name=None):
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
+    app.cli.add_command(reconcile_counters_command)
+    app.cli.add_command(db_advise_command)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(ai_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(import_command)
 
     # Configure logging
     handler = logging.StreamHandler()
@@ -48,17 +211,52 @@ def create_app(config_name=None):
     app.logger.addHandler(handler)
     app.logger.setLevel(logging.DEBUG if app.debug else logging.INFO)
     logging.getLogger('ai_service').addHandler(handler)
+    logging.getLogger('jobs').addHandler(handler)
+    logging.getLogger('playground').addHandler(handler)
+    logging.getLogger('instrumentation').addHandler(handler)
+    logging.getLogger('replica').addHandler(handler)
+    playground.result_cache.max_entries = app.config['PLAYGROUND_CACHE_SIZE']
 
     # Import models so they're registered with SQLAlchemy
-    from models import User, Artist, Artwork, Museum, Collection
+    from models import (User, Artist, Artwork, Museum, Collection, DashboardCounter, Job,
+                        table_versions)
 
     @login_manager.user_loader
     def load_user(user_id):
         return db.session.get(User, int(user_id))
 
-    # Create tables on first run
+    # Create tables on first run (see SCHEMA_BOOTSTRAP)
+    bootstrap = app.config['SCHEMA_BOOTSTRAP']
     with app.app_context():
-        db.create_all()
+        if bootstrap == 'create':
+            db.create_all()
+            if search_index.ensure_index():
+                search_index.rebuild_index()
+            facets.ensure_counts()
+        elif bootstrap == 'check':
+            expected = set(db.metadata.tables)
+            if search_index.supported():
+                expected.add('search_index')
+            missing = expected - set(inspect(db.engine).get_table_names())
+            if missing:
+                raise RuntimeError(f"Database is missing tables {', '.join(sorted(missing))}; "
+                                   f"run `flask db upgrade`")
+        elif bootstrap != 'off':
+            raise ValueError(f"Unknown SCHEMA_BOOTSTRAP: {bootstrap}")
+
+    instrumentation.init_app(app)
+    replica.init_app(app)
+    conditional.init_app(app)
+    fragment_cache.init_app(app)
+    if app.config['METRICS_ENABLED']:
+        metrics.init_app(app)
+
+    if app.config['JOBS_WORKER'] == 'thread':
+        # Started on the first request rather than here so CLI commands and
+        # one-off scripts that build the app don't spawn worker threads.
+        @app.before_request
+        def ensure_job_worker():
+            start_worker(app)
 
     # --- Helpers ---
 
@@ -70,6 +268,34 @@ def create_app(config_name=None):
             url = 'https://' + url
         return url
 
+    def paginate_list(query, model, sort_keys, filtered=False):
+        """Paginate a list view by offset or by keyset, per config/request.
+
+        Pass ``filtered`` when ``query`` narrows the table: keyset pages then
+        show no total, since the approximate count is the whole table's.
+        """
+        per_page = app.config['ITEMS_PER_PAGE']
+        if app.config['PAGINATION_MODE'] == 'keyset' or 'cursor' in request.args:
+            return keyset_paginate(
+                query, model, sort_keys,
+                cursor=request.args.get('cursor'),
+                per_page=per_page,
+                with_total=app.config['PAGINATION_APPROX_TOTAL'] and not filtered,
+            )
+        page = request.args.get('page', 1, type=int)
+        return (
+            query.order_by(*order_clauses(with_tiebreaker(model, sort_keys)))
+            .paginate(page=page, per_page=per_page, error_out=False)
+        )
+
+    @app.template_global()
+    def page_url(**params):
+        """URL for the current view with its query string (filters included)
+        kept and ``params`` overriding individual arguments."""
+        args = request.args.to_dict(flat=False)
+        args.update(params)
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
     # --- Auth Routes ---
 
     @app.route('/register', methods=['GET', 'POST'])
@@ -120,15 +346,17 @@ def create_app(config_name=None):
     # --- Home ---
 
     @app.route('/')
+    @read_only
+    @conditional_get('artists', 'artworks', 'museums', 'collections')
     def index():
+        counters = DashboardCounter.current()
         stats = {
-            'artists': Artist.query.count(),
-            'artworks': Artwork.query.count(),
-            'museums': Museum.query.count(),
-            'collections': Collection.query.count(),
+            'artists': counters.artists,
+            'artworks': counters.artworks,
+            'museums': counters.museums,
+            'collections': counters.collections,
             'recent_artworks': (
-                Artwork.query
-                .outerjoin(Artist)
+                shape_query(Artwork.query, 'recent_artworks')
                 .order_by(Artwork.created_at.desc())
                 .limit(6)
                 .all()
@@ -136,14 +364,22 @@ def create_app(config_name=None):
         }
         return render_template('index.html', stats=stats)
 
+    # --- Search ---
+
+    @app.route('/search')
+    @read_only
+    def search():
+        query = request.args.get('q', '').strip()
+        results = search_index.search(query) if query else []
+        return render_template('search.html', query=query, results=results)
+
     # --- Artists ---
 
     @app.route('/artists')
+    @read_only
+    @conditional_get('artists')
     def artists():
-        page = request.args.get('page', 1, type=int)
-        pagination = Artist.query.order_by(Artist.name).paginate(
-            page=page, per_page=app.config['ITEMS_PER_PAGE'], error_out=False
-        )
+        pagination = paginate_list(Artist.query, Artist, [(Artist.name, False)])
         return render_template('artists.html', pagination=pagination)
 
     @app.route('/artists/create', methods=['GET', 'POST'])
@@ -206,23 +442,22 @@ def create_app(config_name=None):
     # --- Artworks ---
 
     @app.route('/artworks')
+    @read_only
+    @conditional_get('artworks', 'artists')
     def artworks():
-        page = request.args.get('page', 1, type=int)
-        pagination = (
-            Artwork.query
-            .outerjoin(Artist)
-            .order_by(Artwork.title)
-            .paginate(page=page, per_page=app.config['ITEMS_PER_PAGE'], error_out=False)
+        filters = facets.parse_filters(request.args)
+        pagination = paginate_list(
+            facets.apply_filters(shape_query(Artwork.query, 'artworks'), filters),
+            Artwork, [(Artwork.title, False)], filtered=bool(filters)
         )
-        return render_template('artworks.html', pagination=pagination)
+        facet_counts = facets.facet_counts(filters, ttl=app.config['FACET_CACHE_TTL'])
+        return render_template('artworks.html', pagination=pagination,
+                               filters=filters, facets=facet_counts)
 
     @app.route('/artworks/create', methods=['GET', 'POST'])
     @admin_required
     def create_artwork():
         form = ArtworkForm()
-        form.artist_id.choices = [(0, 'Select Artist')] + [
-            (a.id, a.name) for a in Artist.query.order_by(Artist.name).all()
-        ]
         if form.validate_on_submit():
             artwork = Artwork(
                 title=form.title.data,
@@ -258,9 +493,6 @@ def create_app(config_name=None):
             flash('Artwork not found', 'error')
             return redirect(url_for('artworks'))
         form = ArtworkForm(obj=artwork)
-        form.artist_id.choices = [
-            (a.id, a.name) for a in Artist.query.order_by(Artist.name).all()
-        ]
         if form.validate_on_submit():
             form.populate_obj(artwork)
             artwork.image_url = normalize_url(artwork.image_url)
@@ -285,32 +517,37 @@ def create_app(config_name=None):
     @app.route('/artworks/<int:artwork_id>/generate-description', methods=['POST'])
     @admin_required
     def generate_artwork_description(artwork_id):
-        from ai_service import generate_artwork_description as gen_desc
         artwork = db.session.get(Artwork, artwork_id)
         if not artwork:
             return jsonify({'error': 'Artwork not found'}), 404
-        description = gen_desc(artwork)
-        if description:
-            artwork.ai_description = description
-            db.session.commit()
-            flash('AI description generated!', 'success')
-            logger.info(f"AI description generated for artwork id={artwork_id}")
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return jsonify({'description': description})
-        else:
-            flash('Failed to generate description. Check AWS credentials.', 'error')
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return jsonify({'error': 'Generation failed'}), 500
+        job = enqueue('artwork_description', {'artwork_id': artwork_id},
+                      dedupe_key=f'artwork_description:{artwork_id}')
+        logger.info(f"AI description queued for artwork id={artwork_id} (job={job.id})")
+        if (request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+                or request.accept_mimetypes.best == 'application/json'):
+            return jsonify({
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': url_for('job_status', job_id=job.id),
+            }), 202
+        flash('AI description is being generated and will appear shortly.', 'success')
         return redirect(url_for('artworks'))
 
+    @app.route('/jobs/<int:job_id>')
+    @login_required
+    def job_status(job_id):
+        job = db.session.get(Job, job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict())
+
     # --- Museums ---
 
     @app.route('/museums')
+    @read_only
+    @conditional_get('museums')
     def museums():
-        page = request.args.get('page', 1, type=int)
-        pagination = Museum.query.order_by(Museum.name).paginate(
-            page=page, per_page=app.config['ITEMS_PER_PAGE'], error_out=False
-        )
+        pagination = paginate_list(Museum.query, Museum, [(Museum.name, False)])
         return render_template('museums.html', pagination=pagination)
 
     @app.route('/museums/create', methods=['GET', 'POST'])
@@ -372,15 +609,12 @@ def create_app(config_name=None):
     # --- Collections ---
 
     @app.route('/collections')
+    @read_only
+    @conditional_get('collections', 'artworks', 'artists', 'museums')
     def collections():
-        page = request.args.get('page', 1, type=int)
-        pagination = (
-            Collection.query
-            .join(Museum)
-            .join(Artwork)
-            .outerjoin(Artist, Artwork.artist_id == Artist.id)
-            .order_by(Collection.id.desc())
-            .paginate(page=page, per_page=app.config['ITEMS_PER_PAGE'], error_out=False)
+        pagination = paginate_list(
+            shape_query(Collection.query, 'collections'), Collection,
+            [(Collection.id, True)]
         )
         return render_template('collections.html', pagination=pagination)
 
@@ -388,12 +622,6 @@ def create_app(config_name=None):
     @admin_required
     def create_collection():
         form = CollectionForm()
-        form.museum_id.choices = [(0, 'Select Museum')] + [
-            (m.id, m.name) for m in Museum.query.order_by(Museum.name).all()
-        ]
-        form.artwork_id.choices = [(0, 'Select Artwork')] + [
-            (a.id, a.title) for a in Artwork.query.order_by(Artwork.title).all()
-        ]
         if form.validate_on_submit():
             collection = Collection(
                 museum_id=form.museum_id.data,
@@ -413,21 +641,12 @@ def create_app(config_name=None):
             db.session.commit()
             flash('Collection entry created successfully!', 'success')
 
-            # Auto-generate collection description if museum has 5+ artworks
+            # Queue the collection overview; the job checks for 5+ artworks
+            # and runs at most once per museum at a time.
             museum = db.session.get(Museum, form.museum_id.data)
-            if museum:
-                artwork_count = Collection.query.filter_by(museum_id=museum.id).count()
-                if artwork_count >= 5 and not museum.ai_collection_description:
-                    from ai_service import generate_collection_description
-                    museum_artworks = [
-                        c.artwork for c in
-                        Collection.query.filter_by(museum_id=museum.id).all()
-                    ]
-                    desc = generate_collection_description(museum, museum_artworks)
-                    if desc:
-                        museum.ai_collection_description = desc
-                        db.session.commit()
-                        flash('AI collection description auto-generated!', 'success')
+            if museum and not museum.ai_collection_description:
+                enqueue('collection_overview', {'museum_id': museum.id},
+                        dedupe_key=f'collection_overview:{museum.id}')
 
             return redirect(url_for('collections'))
         return render_template('collection_form.html', form=form, title='Add to Collection')
@@ -440,12 +659,6 @@ def create_app(config_name=None):
             flash('Collection entry not found', 'error')
             return redirect(url_for('collections'))
         form = CollectionForm(obj=collection)
-        form.museum_id.choices = [
-            (m.id, m.name) for m in Museum.query.order_by(Museum.name).all()
-        ]
-        form.artwork_id.choices = [
-            (a.id, a.title) for a in Artwork.query.order_by(Artwork.title).all()
-        ]
         if form.validate_on_submit():
             form.populate_obj(collection)
             db.session.commit()
@@ -469,13 +682,16 @@ def create_app(config_name=None):
     ALLOWED_TABLES = {'artists', 'artworks', 'museums', 'collections'}
     ALLOWED_OPERATORS = {'=', '!=', '>', '<', '>=', '<=', 'LIKE'}
     COLUMN_PATTERN = re.compile(r'^[a-zA-Z_*]+$')
+    QUERY_ID_PATTERN = re.compile(r'^[A-Za-z0-9-]{8,64}$')
 
     @app.route('/sql-playground', methods=['GET', 'POST'])
     @login_required
+    @read_only
     def sql_playground():
         form = SQLQueryForm()
         results = None
         generated_sql = None
+        profile = None
 
         if form.validate_on_submit():
             table = form.table.data
@@ -513,33 +729,92 @@ def create_app(config_name=None):
             order = form.order_by.data.strip() if form.order_by.data else ''
             if order and re.match(r'^[a-zA-Z_]+(\s+(ASC|DESC))?$', order, re.IGNORECASE):
                 query += f" ORDER BY {order}"
+            else:
+                order = ''
 
-            limit = form.limit.data or 50
+            max_rows = app.config['PLAYGROUND_MAX_ROWS']
+            limit = min(form.limit.data or 50, max_rows)
             query += f" LIMIT {limit}"
 
             generated_sql = query.replace(':val', repr(where_val)) if params else query
 
+            query_id = request.form.get('query_id', '')
+            if not QUERY_ID_PATTERN.match(query_id):
+                query_id = uuid.uuid4().hex
+            cache_key = playground.cache_key(table, columns, where_col, where_op,
+                                             where_val, order, limit)
             try:
-                if params:
-                    result = db.session.execute(
-                        db.text(query),
-                        {'val': params[0]}
+                version = table_versions([table])[table]
+                # Explain runs always hit the database: the timings are the point.
+                outcome = (None if form.explain.data
+                           else playground.result_cache.get(cache_key, version))
+                if outcome is None:
+                    outcome = playground.run_query(
+                        query, {'val': params[0]} if params else {},
+                        query_id=query_id, user_id=current_user.id,
+                        timeout=app.config['PLAYGROUND_TIMEOUT'], max_rows=max_rows,
+                        explain=form.explain.data,
                     )
+                    if not form.explain.data:
+                        playground.result_cache.set(cache_key, version, outcome)
+                    timing = f'in {outcome.elapsed * 1000:.0f} ms'
                 else:
-                    result = db.session.execute(db.text(query))
-                results = [dict(row._mapping) for row in result]
-                flash(f'Query returned {len(results)} results', 'success')
+                    timing = '(cached)'
+                results = outcome.rows
+                profile = outcome.profile
+                flash(f'Query returned {len(results)} results {timing}', 'success')
+                if outcome.truncated or (form.limit.data or 0) > max_rows:
+                    flash(f'Results are capped at {max_rows} rows.', 'info')
+            except playground.QueryAborted as e:
+                db.session.rollback()
+                if e.reason == 'cancelled':
+                    flash(f'Query cancelled after {e.elapsed:.1f}s.', 'info')
+                else:
+                    flash(f"Query stopped: it exceeded the {app.config['PLAYGROUND_TIMEOUT']:g}s "
+                          f"time limit. Add a WHERE condition or a smaller LIMIT.", 'error')
             except Exception as e:
+                db.session.rollback()
                 flash(f'SQL Error: {e}', 'error')
                 logger.warning(f"SQL Playground error: {e}")
 
         return render_template('sql_playground.html', form=form,
-                             results=results, sql=generated_sql)
+                             results=results, sql=generated_sql, profile=profile)
+
+    @app.route('/sql-playground/cancel', methods=['POST'])
+    @login_required
+    def cancel_playground_query():
+        if app.config.get('WTF_CSRF_ENABLED', True):
+            try:
+                validate_csrf(request.headers.get('X-CSRFToken'))
+            except ValidationError:
+                return jsonify({'error': 'Invalid CSRF token'}), 400
+        query_id = (request.get_json(silent=True) or {}).get('query_id', '')
+        if not playground.cancel(query_id, current_user.id):
+            return jsonify({'cancelled': False, 'error': 'No such running query'}), 404
+        return jsonify({'cancelled': True})
+
+    # --- API: typeahead lookups for form pickers ---
+
+    @app.route('/api/lookup/<kind>')
+    @login_required
+    def lookup(kind):
+        from lookup import LOOKUPS, DEFAULT_LIMIT, search, resolve
+        if kind not in LOOKUPS:
+            return jsonify({'error': 'Unknown lookup'}), 404
+        row_id = request.args.get('id')
+        if row_id is not None:
+            label = resolve(kind, row_id)
+            if label is None:
+                return jsonify({'error': 'Not found'}), 404
+            return jsonify({'id': int(row_id), 'label': label})
+        return jsonify(search(kind, request.args.get('q', ''),
+                              request.args.get('limit', DEFAULT_LIMIT, type=int)))
 
     # --- API: table columns for SQL Playground ---
 
     @app.route('/api/table-columns/<table_name>')
     @login_required
+    @read_only
     def table_columns(table_name):
         model_map = {
             'artists': Artist, 'artworks': Artwork,
@@ -551,10 +826,49 @@ def create_app(config_name=None):
         columns = [c.name for c in model.__table__.columns]
         return jsonify(columns)
 
+    # --- API: AI text cache statistics ---
+
+    @app.route('/api/ai-cache/stats')
+    @login_required
+    def ai_cache_stats():
+        from ai_cache import get_cache
+        cache = get_cache(app.config)
+        if cache is None:
+            return jsonify({'enabled': False})
+        return jsonify({'enabled': True, **cache.stats()})
+
+    # --- Prometheus metrics ---
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        if not app.config['METRICS_ENABLED']:
+            abort(404)
+        body, content_type = metrics.render()
+        return Response(body, content_type=content_type)
+
+    # --- Import ---
+
+    @app.route('/import', methods=['GET', 'POST'])
+    @admin_required
+    def import_data():
+        form = ImportForm()
+        report = None
+        if form.validate_on_submit():
+            upload = form.file.data
+            report = importer.import_file(
+                upload.stream, form.kind.data, importer.detect_format(upload.filename),
+                batch_size=app.config['IMPORT_BATCH_SIZE'],
+            )
+            category = 'info' if report.error_count else 'success'
+            flash(f'Imported {report.inserted + report.updated} of {report.rows} '
+                  f'{form.kind.data} rows.', category)
+        return render_template('import.html', form=form, report=report)
+
     # --- Export ---
 
     @app.route('/export/<table_name>')
     @login_required
+    @read_only
     def export_csv(table_name):
         if table_name not in ALLOWED_TABLES:
             flash('Invalid table name', 'error')
@@ -564,27 +878,24 @@ def create_app(config_name=None):
             'artists': Artist, 'artworks': Artwork,
             'museums': Museum, 'collections': Collection
         }
-        model = model_map[table_name]
-        rows = model.query.all()
+        table = model_map[table_name].__table__
 
-        if not rows:
+        if not table_has_rows(table):
             flash('No data to export', 'error')
             return redirect(url_for(table_name))
 
-        # Get column names from model
-        col_names = [c.name for c in model.__table__.columns]
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=col_names)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow({c: getattr(row, c) for c in col_names})
-
-        output.seek(0)
-        return send_file(
-            io.BytesIO(output.getvalue().encode()),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'{table_name}_export.csv'
+        chunks = iter_csv_rows(table)
+        download_name = f'{table_name}_export.csv'
+        mimetype = 'text/csv'
+        if request.args.get('gzip', type=int):
+            chunks = gzip_chunks(chunks)
+            download_name += '.gz'
+            mimetype = 'application/gzip'
+
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={download_name}'}
         )
 
     # --- Test ---
@@ -0,0 +1,146 @@
+"""Keyset (cursor) pagination for the list views.
+
+Offset pagination runs a ``COUNT(*)`` and an ``OFFSET`` scan on every page,
+so deep pages get slower as the catalogue grows. Keyset pagination instead
+seeks past the sort key of the last row on the current page, which costs the
+same on page 1 and page 10,000 as long as the sort keys are indexed.
+"""
+
+import base64
+import binascii
+import json
+from sqlalchemy import and_, or_, func, select, text
+from extensions import db
+
+
+class KeysetPagination:
+    """One page of keyset results, shaped like Flask-SQLAlchemy's Pagination."""
+
+    is_keyset = True
+
+    def __init__(self, items, per_page, has_next, has_prev,
+                 next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def pages(self):
+        # Keyset pages aren't numbered; only report whether there is more
+        # than one so templates can decide whether to show navigation.
+        return 2 if self.has_next or self.has_prev else 1
+
+
+def encode_cursor(values, direction):
+    """Pack sort-key values and a direction into an opaque URL-safe token."""
+    payload = json.dumps({'v': values, 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a cursor token. Returns (values, direction) or raises ValueError."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['v'], payload['d']
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError,
+            KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from e
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise ValueError("Invalid cursor payload")
+    return values, direction
+
+
+def with_tiebreaker(model, sort_keys):
+    """Append the primary key to ``sort_keys`` unless it is already last.
+
+    ``sort_keys`` is a list of ``(column, descending)`` pairs. The tiebreaker
+    shares the direction of the final key so the ordering stays a total order.
+    """
+    mapper = model.__mapper__
+    pk = getattr(model, mapper.get_property_by_column(mapper.primary_key[0]).key)
+    if sort_keys[-1][0] is pk:
+        return list(sort_keys)
+    return list(sort_keys) + [(pk, sort_keys[-1][1])]
+
+
+def order_clauses(sort_keys, reverse=False):
+    """ORDER BY clauses for ``sort_keys``, optionally flipped for a prev page."""
+    return [col.asc() if desc == reverse else col.desc() for col, desc in sort_keys]
+
+
+def _seek_condition(sort_keys, values, reverse):
+    """Row-value comparison ``(k1, k2, ...) > (v1, v2, ...)`` expanded into
+    AND/OR terms so mixed directions work on every backend."""
+    terms = []
+    for i, (col, desc) in enumerate(sort_keys):
+        equal = [sort_keys[j][0] == values[j] for j in range(i)]
+        forward = col < values[i] if desc != reverse else col > values[i]
+        terms.append(and_(*equal, forward))
+    return or_(*terms)
+
+
+def approximate_count(model):
+    """Cheap row-count estimate that avoids a full ``COUNT(*)`` scan.
+
+    Postgres keeps an estimate in ``pg_class.reltuples``; elsewhere the
+    highest primary key is an index lookup and an upper bound on the count.
+    """
+    table = model.__table__
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+            {'t': table.name}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+    pk = model.__mapper__.primary_key[0]
+    return db.session.execute(select(func.max(pk))).scalar() or 0
+
+
+def keyset_paginate(query, model, sort_keys, cursor=None, per_page=20,
+                    with_total=False):
+    """Fetch one page of ``query`` seeking on ``sort_keys`` from ``cursor``.
+
+    An empty or malformed cursor returns the first page. The primary key is
+    added as a tiebreaker so rows sharing a sort value are never skipped.
+    """
+    sort_keys = with_tiebreaker(model, sort_keys)
+    values, direction = None, 'next'
+    if cursor:
+        try:
+            values, direction = decode_cursor(cursor)
+        except ValueError:
+            values, direction = None, 'next'
+        if values is not None and len(values) != len(sort_keys):
+            values, direction = None, 'next'
+
+    reverse = direction == 'prev'
+    if values is not None:
+        query = query.filter(_seek_condition(sort_keys, values, reverse))
+    rows = query.order_by(*order_clauses(sort_keys, reverse)).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = values is not None, has_more
+
+    def keys_of(item):
+        return [getattr(item, col.key) for col, _ in sort_keys]
+
+    return KeysetPagination(
+        items=rows,
+        per_page=per_page,
+        has_next=has_next and bool(rows),
+        has_prev=has_prev and bool(rows),
+        next_cursor=encode_cursor(keys_of(rows[-1]), 'next') if rows else None,
+        prev_cursor=encode_cursor(keys_of(rows[0]), 'prev') if rows else None,
+        total=approximate_count(model) if with_total else None,
+    )
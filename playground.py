@@ -0,0 +1,414 @@
+"""Bounded execution for SQL playground queries.
+
+Every query runs under a deadline and a row cap, and can be cancelled by the
+user who started it:
+
+* SQLite: a progress handler, called every few thousand VM steps, aborts the
+  statement once the deadline passes or a cancel is requested.
+* Postgres: ``SET LOCAL statement_timeout``; cancel sends
+  ``pg_cancel_backend`` for the query's backend.
+* MySQL: ``MAX_EXECUTION_TIME``; cancel sends ``KILL QUERY``.
+
+Running queries are tracked in a per-process registry keyed by a
+client-generated id, so a cancel has to reach the process running the query
+(sticky sessions, or a single web process).
+
+In explain mode a run also returns the query plan, the indexes it uses,
+compile / execute / fetch timings and rows examined versus returned.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+# VM instructions between SQLite progress-handler calls
+SQLITE_PROGRESS_STEPS = 5000
+
+
+class QueryAborted(Exception):
+    """The query hit its deadline or was cancelled."""
+
+    def __init__(self, reason, elapsed):
+        super().__init__(f"Query {reason} after {elapsed:.2f}s")
+        self.reason = reason
+        self.elapsed = elapsed
+
+
+class RunningQuery:
+    """Registry entry for a query in flight."""
+
+    def __init__(self, query_id, user_id, sql, timeout, engine):
+        self.query_id = query_id
+        self.user_id = user_id
+        self.sql = sql
+        # The engine the session bound to (the primary or, under
+        # ``@read_only``, the replica); cancels must go to the same server.
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+        self.cancelled = threading.Event()
+        # Server-side connection id, used to interrupt the statement from a
+        # second connection on Postgres/MySQL.
+        self.backend_id = None
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+class PlaygroundResult:
+    def __init__(self, rows, columns, truncated, elapsed, profile=None):
+        self.rows = rows
+        self.columns = columns
+        self.truncated = truncated
+        self.elapsed = elapsed
+        # Set in explain mode: see profile_query()
+        self.profile = profile
+
+
+_running = {}
+_running_lock = threading.Lock()
+
+
+def running_queries():
+    with _running_lock:
+        return list(_running.values())
+
+
+def _register(query):
+    with _running_lock:
+        if query.query_id in _running:
+            raise ValueError(f"Query id {query.query_id} is already running")
+        _running[query.query_id] = query
+
+
+def _unregister(query):
+    with _running_lock:
+        _running.pop(query.query_id, None)
+
+
+def cancel(query_id, user_id):
+    """Ask a running query to stop. Returns False if no such query belongs
+    to ``user_id`` in this process."""
+    with _running_lock:
+        query = _running.get(query_id)
+    if query is None or query.user_id != user_id:
+        return False
+    query.cancelled.set()
+    # SQLite notices the flag in its progress handler; server databases need
+    # the statement interrupted from a second connection.
+    if query.backend_id is not None and query.dialect in ('postgresql', 'mysql'):
+        if query.dialect == 'postgresql':
+            statement = text("SELECT pg_cancel_backend(:id)").bindparams(id=query.backend_id)
+        else:
+            statement = text(f"KILL QUERY {int(query.backend_id)}")
+        try:
+            with query.engine.connect() as conn:
+                conn.execute(statement)
+        except DBAPIError as e:
+            logger.warning(f"Could not interrupt playground query {query_id}: {e}")
+    return True
+
+
+def _arm(conn, query):
+    """Install the deadline on ``conn``; returns a callable that removes it."""
+    timeout_ms = max(1, int((query.deadline - time.monotonic()) * 1000))
+    if query.dialect == 'sqlite':
+        raw = conn.connection.dbapi_connection
+
+        def progress():
+            # A non-zero return makes SQLite abort with "interrupted".
+            return query.cancelled.is_set() or time.monotonic() > query.deadline
+
+        raw.set_progress_handler(progress, SQLITE_PROGRESS_STEPS)
+        return lambda: raw.set_progress_handler(None, 0)
+    if query.dialect == 'postgresql':
+        query.backend_id = conn.execute(text("SELECT pg_backend_pid()")).scalar()
+        conn.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+        return lambda: None
+    if query.dialect == 'mysql':
+        query.backend_id = conn.execute(text("SELECT CONNECTION_ID()")).scalar()
+        conn.execute(text(f"SET SESSION MAX_EXECUTION_TIME = {timeout_ms}"))
+        return lambda: conn.execute(text("SET SESSION MAX_EXECUTION_TIME = 0"))
+    logger.warning(f"No statement deadline support for {query.dialect}")
+    return lambda: None
+
+
+def run_query(sql, params, *, query_id, user_id, timeout, max_rows, explain=False):
+    """Run a playground SELECT on the request's session.
+
+    Returns a ``PlaygroundResult`` with at most ``max_rows`` rows. Raises
+    ``QueryAborted`` if the statement runs past ``timeout`` seconds or is
+    cancelled; the caller should roll the session back.
+
+    With ``explain``, the result also carries a profile (plan, indexes,
+    phase timings, rows examined).
+    """
+    conn = db.session.connection()
+    query = RunningQuery(query_id, user_id, sql, timeout, conn.engine)
+    _register(query)
+    disarm = None
+    try:
+        disarm = _arm(conn, query)
+        plan = explain_plan(conn, sql, params) if explain else None
+        marks = {}
+        listeners = _listen_phases(conn, marks) if explain else []
+        marks['start'] = time.perf_counter()
+        try:
+            result = conn.execute(text(sql), params)
+            marks['executed'] = time.perf_counter()
+            # Fetch one past the cap to know whether anything was cut off.
+            rows = result.fetchmany(max_rows + 1)
+            columns = list(result.keys())
+            result.close()
+            marks['fetched'] = time.perf_counter()
+        finally:
+            for name, fn in listeners:
+                event.remove(conn, name, fn)
+        profile = None
+        if explain:
+            returned = min(len(rows), max_rows)
+            profile = profile_query(plan, marks, returned)
+    except DBAPIError as e:
+        elapsed = query.elapsed
+        if query.cancelled.is_set():
+            reason = 'cancelled'
+        elif time.monotonic() >= query.deadline or _is_timeout(e):
+            reason = 'timed out'
+        else:
+            raise
+        logger.warning(f"Playground query {query_id} {reason} after {elapsed:.2f}s "
+                       f"(user={user_id}): {sql}")
+        raise QueryAborted(reason, elapsed) from e
+    finally:
+        _unregister(query)
+        if disarm is not None:
+            try:
+                disarm()
+            except DBAPIError:
+                pass
+    return PlaygroundResult([dict(row._mapping) for row in rows[:max_rows]],
+                            columns, len(rows) > max_rows, query.elapsed, profile)
+
+
+# --- Result cache ---
+
+class ResultCache:
+    """Bounded LRU of playground results, each tagged with the version of
+    the table it was read from (see ``models.TableVersion``). An entry is
+    served only while that version is still current, so any committed write
+    to the table retires it."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, result):
+        with self._lock:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = ResultCache()
+
+
+def cache_key(table, columns, where_column, where_operator, where_value, order_by, limit):
+    """Normalise the query builder's inputs so equivalent queries share an
+    entry (column lists and ORDER BY compare case- and space-insensitively;
+    the WHERE value is kept verbatim)."""
+    columns = tuple(c.strip().lower() for c in columns.split(','))
+    order = ' '.join((order_by or '').lower().split())
+    where = ((where_column.lower(), where_operator.upper(), where_value)
+             if where_column and where_operator and where_value is not None else None)
+    return (table, columns, where, order, limit)
+
+
+# --- Explain / profile mode ---
+
+_SQLITE_INDEX = re.compile(r'USING (?:COVERING )?INDEX (\w+)|USING (INTEGER PRIMARY KEY)')
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+_SQLITE_TABLE = re.compile(r'^(SCAN|SEARCH) (\w+)')
+
+
+def _listen_phases(conn, marks):
+    """Record when the statement finished compiling and when the driver
+    returned, so the caller can split compile / execute / fetch time.
+    Returns the listeners for removal."""
+    def before_cursor_execute(*args):
+        marks.setdefault('compiled', time.perf_counter())
+
+    def after_cursor_execute(*args):
+        marks.setdefault('cursor_done', time.perf_counter())
+
+    handlers = [('before_cursor_execute', before_cursor_execute),
+                ('after_cursor_execute', after_cursor_execute)]
+    for name, fn in handlers:
+        event.listen(conn, name, fn)
+    return handlers
+
+
+def explain_plan(conn, sql, params):
+    """Return ``{'lines', 'indexes', 'full_scans', 'rows_examined',
+    'rows_estimate'}`` for ``sql``.
+
+    On Postgres the plan comes from ``EXPLAIN ANALYZE`` (the query runs
+    twice), so ``rows_examined`` is exact. Elsewhere it is ``None`` and
+    ``rows_estimate`` comes from the optimizer's statistics instead: MySQL's
+    EXPLAIN row estimates, or ``sqlite_stat1`` on SQLite.
+    """
+    dialect = conn.dialect.name
+    plan = {'lines': [], 'indexes': [], 'full_scans': [], 'rows_examined': None,
+            'rows_estimate': None}
+    if dialect == 'sqlite':
+        estimate = 0
+        for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params):
+            detail = row[-1]
+            plan['lines'].append(detail)
+            rows = _sqlite_rows_estimate(conn, detail)
+            if rows is not None:
+                estimate += rows
+            match = _SQLITE_INDEX.search(detail)
+            if match:
+                plan['indexes'].append(match.group(1) or 'PRIMARY KEY')
+            match = _SQLITE_SCAN.match(detail)
+            if match:
+                plan['full_scans'].append(match.group(1))
+        plan['rows_estimate'] = estimate if plan['lines'] else None
+    elif dialect == 'postgresql':
+        raw = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"), params).scalar()
+        root = (json.loads(raw) if isinstance(raw, str) else raw)[0]['Plan']
+        examined = 0
+
+        def walk(node, depth):
+            nonlocal examined
+            label = node['Node Type']
+            if node.get('Index Name'):
+                label += f" using {node['Index Name']}"
+                plan['indexes'].append(node['Index Name'])
+            if node.get('Relation Name'):
+                label += f" on {node['Relation Name']}"
+            loops = node.get('Actual Loops', 1)
+            removed = node.get('Rows Removed by Filter', 0) + node.get('Rows Removed by Index Recheck', 0)
+            plan['lines'].append(f"{'  ' * depth}{label} (actual rows={node.get('Actual Rows')}, "
+                                 f"loops={loops}, removed by filter={removed})")
+            if 'Scan' in node['Node Type'] and node.get('Relation Name'):
+                examined += (node.get('Actual Rows', 0) + removed) * loops
+                if node['Node Type'] == 'Seq Scan':
+                    plan['full_scans'].append(node['Relation Name'])
+            for child in node.get('Plans', []):
+                walk(child, depth + 1)
+
+        walk(root, 0)
+        plan['rows_examined'] = examined
+    elif dialect == 'mysql':
+        estimate = 0
+        for row in conn.execute(text(f"EXPLAIN {sql}"), params).mappings():
+            estimate += row['rows'] or 0
+            plan['lines'].append(f"{row['table']}: type={row['type']} key={row['key']} "
+                                 f"rows={row['rows']} {row.get('Extra') or ''}".rstrip())
+            if row['key']:
+                plan['indexes'].append(row['key'])
+            if row['type'] == 'ALL':
+                plan['full_scans'].append(row['table'])
+        plan['rows_estimate'] = estimate
+    return plan
+
+
+def _sqlite_rows_estimate(conn, detail):
+    """Estimate the rows one EXPLAIN QUERY PLAN step reads, from
+    ``sqlite_stat1`` (written by ANALYZE) so nothing is scanned to find out.
+
+    An index search reads about the index's average rows per key for the
+    columns it constrains with ``=``; a scan, or a search there are no
+    statistics for, is put at the table's size. Without statistics that
+    falls back to ``max(rowid)`` (one B-tree seek).
+    """
+    match = _SQLITE_TABLE.match(detail)
+    if not match:
+        return None
+    kind, table = match.groups()
+    index = _SQLITE_INDEX.search(detail)
+    if kind == 'SEARCH' and '(rowid=?)' in detail:
+        return 1
+    stats = {}
+    has_stat1 = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    )).first()
+    if has_stat1:
+        # stat is "<rows> <avg rows per key on col 1> <... cols 1-2> ...",
+        # possibly followed by flags like "unordered"
+        stats = {idx: [int(n) for n in stat.split() if n.isdigit()]
+                 for idx, stat in conn.execute(
+                     text("SELECT idx, stat FROM sqlite_stat1 WHERE tbl = :tbl"),
+                     {'tbl': table})}
+    counts = stats.get(index.group(1)) if kind == 'SEARCH' and index else None
+    if counts:
+        # A range-only search can read anything up to the whole table
+        equalities = detail.count('=?') - detail.count('>=?') - detail.count('<=?')
+        return counts[min(equalities, len(counts) - 1)]
+    if any(stats.values()):
+        return max(counts[0] for counts in stats.values() if counts)
+    return conn.execute(text(f"SELECT max(rowid) FROM {table}")).scalar() or 0
+
+
+def profile_query(plan, marks, returned):
+    """Combine the plan with phase timings and a rows-examined figure."""
+    compiled = marks.get('compiled', marks['start'])
+    cursor_done = marks.get('cursor_done', marks['executed'])
+    profile = {
+        'plan': plan['lines'],
+        'indexes': list(dict.fromkeys(plan['indexes'])),
+        'full_scans': list(dict.fromkeys(plan['full_scans'])),
+        'compile_ms': (compiled - marks['start']) * 1000,
+        'execute_ms': (cursor_done - compiled) * 1000,
+        # Includes result construction; SQLite does most of its work here,
+        # since rows are produced as they are stepped.
+        'fetch_ms': (marks['fetched'] - cursor_done) * 1000,
+        'rows_returned': returned,
+        'rows_examined': plan['rows_examined'],
+        'rows_examined_exact': plan['rows_examined'] is not None,
+    }
+    if profile['rows_examined'] is None:
+        # The stdlib sqlite3 driver doesn't expose sqlite3_stmt_status(), so
+        # there are no per-statement row counters; use the statistics-based
+        # estimate, never less than what came back.
+        estimate = plan.get('rows_estimate')
+        profile['rows_examined'] = max(estimate, returned) if estimate is not None else returned
+    return profile
+
+
+def _is_timeout(error):
+    message = str(error.orig).lower()
+    return ('interrupted' in message                       # SQLite progress handler
+            or 'statement timeout' in message              # Postgres
+            or 'maximum statement execution time' in message)  # MySQL
@@ -0,0 +1,45 @@
+"""Eager-loading shapes for the list views.
+
+Each list page declares the relationships its template touches, and
+``shape_query`` turns those declarations into joined eager loads so a page
+renders in a fixed number of round trips instead of one lazy SELECT per row.
+"""
+
+from sqlalchemy.orm import joinedload
+
+# Relationship paths each view's template walks, as dotted attribute names
+# starting from the queried model.
+LIST_SHAPES = {
+    'artworks': ('artist',),
+    'recent_artworks': ('artist',),
+    'collections': ('artwork.artist', 'museum'),
+}
+
+
+def _load_option(model, path):
+    """Build a chained joinedload option for a dotted relationship path.
+
+    Many-to-one hops whose foreign key is NOT NULL are loaded with an inner
+    join, so the shaped query filters out orphan rows the same way an
+    explicit ``.join()`` would; nullable hops use a LEFT OUTER JOIN.
+    """
+    option = None
+    current = model
+    for name in path.split('.'):
+        attr = getattr(current, name)
+        prop = attr.property
+        innerjoin = prop.direction.name == 'MANYTOONE' and not any(
+            col.nullable for col in prop.local_columns
+        )
+        if option is None:
+            option = joinedload(attr, innerjoin=innerjoin)
+        else:
+            option = option.joinedload(attr, innerjoin=innerjoin)
+        current = prop.mapper.class_
+    return option
+
+
+def shape_query(query, shape):
+    """Apply the eager loads declared for ``shape`` to a model query."""
+    model = query.column_descriptions[0]['entity']
+    return query.options(*(_load_option(model, path) for path in LIST_SHAPES[shape]))
@@ -0,0 +1,131 @@
+"""Read-replica routing for read-only views.
+
+Set ``REPLICA_DATABASE_URL`` and views decorated with ``read_only`` send
+their SELECTs to the replica engine (Flask-SQLAlchemy bind ``replica``).
+Everything else stays on the primary: other views, CLI commands, job
+workers, and any write issued from a read-only view (flushes and INSERT /
+UPDATE / DELETE statements always use the primary).
+
+After a request that can write (any non-GET request outside a read-only
+view) the client is pinned to the primary for ``REPLICA_STICKY_SECONDS``
+through its session cookie, so the pages it is redirected to show its own
+changes even if the replica lags.
+
+The replica is probed at most every ``REPLICA_CHECK_INTERVAL`` seconds by
+reading ``table_versions``; while the probe fails, or after a query on it
+fails with a connection error, read-only views fall back to the primary.
+"""
+
+import logging
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+BIND_KEY = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY = '_primary_until'
+
+
+class _Health:
+    """Per-process replica health, re-probed after ``interval`` seconds."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.healthy = True
+        self.checked_at = None
+
+    def mark_down(self, reason):
+        with self.lock:
+            if self.healthy:
+                logger.warning(f"Read replica unavailable, using the primary: {reason}")
+            self.healthy = False
+            self.checked_at = time.monotonic()
+
+    def check(self, engine, interval):
+        with self.lock:
+            now = time.monotonic()
+            if self.checked_at is not None and now - self.checked_at < interval:
+                return self.healthy
+            self.checked_at = now
+        # Probe outside the lock; concurrent requests keep the old verdict.
+        from models import TableVersion
+        try:
+            with engine.connect() as conn:
+                conn.execute(select(TableVersion.__table__.c.version).limit(1)).all()
+        except DBAPIError as e:
+            self.mark_down(e.orig)
+            return False
+        with self.lock:
+            if not self.healthy:
+                logger.info("Read replica is back")
+            self.healthy = True
+        return True
+
+
+health = _Health()
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica while ``g.use_replica`` is set.
+
+    The flag lives on ``g`` rather than the session because streamed
+    responses (exports) run after the request's session has been removed.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and g.get('use_replica') and not self._flushing
+                and not isinstance(clause, UpdateBase)):
+            engine = self._db.engines.get(BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _pinned_to_primary():
+    until = session.get(STICKY_KEY)
+    return until is not None and until > time.time()
+
+
+def read_only(view):
+    """Serve the view's queries from the replica when one is configured,
+    healthy and the client hasn't just written."""
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        g.read_only = True
+        db = current_app.extensions['sqlalchemy']
+        engine = db.engines.get(BIND_KEY)
+        if (engine is not None and not _pinned_to_primary()
+                and health.check(engine, current_app.config['REPLICA_CHECK_INTERVAL'])):
+            g.use_replica = True
+        return view(*args, **kwargs)
+    return decorated_function
+
+
+def init_app(app):
+    """Register the stickiness hook and replica error listener (no-op
+    without a replica)."""
+    from extensions import db
+    with app.app_context():
+        engine = db.engines.get(BIND_KEY)
+    if engine is None:
+        return
+
+    def handle_error(context):
+        if context.is_disconnect:
+            health.mark_down(context.original_exception)
+
+    event.listen(engine, 'handle_error', handle_error)
+    sticky = app.config['REPLICA_STICKY_SECONDS']
+
+    @app.after_request
+    def pin_writers_to_primary(response):
+        if request.method not in SAFE_METHODS and not g.get('read_only'):
+            session[STICKY_KEY] = time.time() + sticky
+        return response
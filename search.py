@@ -0,0 +1,240 @@
+"""Full-text search over artworks, artists and museums.
+
+Searchable text is copied into one index table: an FTS5 virtual table on
+SQLite, or a table with a generated, GIN-indexed ``tsvector`` on Postgres.
+An ``after_flush`` listener keeps it in step with ORM writes inside the same
+transaction; ``rebuild_index()`` (``flask search rebuild``) repopulates it
+after bulk loads that bypass the ORM. Other backends fall back to ``LIKE``.
+
+Each document's rowid encodes its source, ``ref_id * 4 + kind code``, so
+updates and deletes are primary-key operations on either backend.
+"""
+
+import logging
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import event, inspect, select, text
+from extensions import db
+from models import Artist, Artwork, Museum
+
+logger = logging.getLogger(__name__)
+
+# kind -> (model, code, title attribute, body attributes)
+SOURCES = {
+    'artwork': (Artwork, 1, 'title', ('description', 'ai_description')),
+    'artist': (Artist, 2, 'name', ('bio',)),
+    'museum': (Museum, 3, 'name', ('description',)),
+}
+KIND_BY_MODEL = {model: kind for kind, (model, *_) in SOURCES.items()}
+KIND_BY_CODE = {code: kind for kind, (_, code, *_) in SOURCES.items()}
+
+# Highlight markers the database wraps around matches. They can't occur in
+# catalogue text, so the snippet can be HTML-escaped first and the markers
+# swapped for <mark> tags afterwards.
+MARK_START, MARK_END = '\x02', '\x03'
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "title, body, tokenize = 'porter unicode61')"
+)
+POSTGRES_DDL = (
+    """CREATE TABLE IF NOT EXISTS search_index (
+        doc_id BIGINT PRIMARY KEY,
+        title TEXT NOT NULL DEFAULT '',
+        body TEXT NOT NULL DEFAULT '',
+        document TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', title), 'A') ||
+            setweight(to_tsvector('english', body), 'B')
+        ) STORED
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_search_index_document ON search_index USING GIN (document)",
+)
+
+
+def _dialect(bind):
+    return bind.dialect.name
+
+
+def supported(bind=None):
+    return _dialect(bind or db.engine) in ('sqlite', 'postgresql')
+
+
+def doc_id(kind, ref_id):
+    return ref_id * 4 + SOURCES[kind][1]
+
+
+def document_for(obj):
+    """Return (kind, ref_id, title, body) for a searchable model instance."""
+    kind = KIND_BY_MODEL[type(obj)]
+    _, _, title_attr, body_attrs = SOURCES[kind]
+    body = '\n'.join(filter(None, (getattr(obj, a) for a in body_attrs)))
+    return kind, obj.id, getattr(obj, title_attr) or '', body
+
+
+def ensure_index(bind=None):
+    """Create the index table if needed; returns True if it was just created."""
+    bind = bind or db.engine
+    if not supported(bind):
+        return False
+    with bind.begin() as conn:
+        existed = inspect(conn).has_table('search_index')
+        if _dialect(bind) == 'sqlite':
+            conn.execute(text(SQLITE_DDL))
+        else:
+            for ddl in POSTGRES_DDL:
+                conn.execute(text(ddl))
+    return not existed
+
+
+def _upsert(conn, docs):
+    if not docs:
+        return
+    rows = [{'doc_id': doc_id(kind, ref_id), 'title': title, 'body': body}
+            for kind, ref_id, title, body in docs]
+    if _dialect(conn) == 'sqlite':
+        # FTS5 has no ON CONFLICT; replace by rowid instead.
+        conn.execute(text("DELETE FROM search_index WHERE rowid = :doc_id"), rows)
+        conn.execute(text("INSERT INTO search_index (rowid, title, body) "
+                          "VALUES (:doc_id, :title, :body)"), rows)
+    else:
+        conn.execute(text(
+            "INSERT INTO search_index (doc_id, title, body) VALUES (:doc_id, :title, :body) "
+            "ON CONFLICT (doc_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body"
+        ), rows)
+
+
+def _delete(conn, keys):
+    if not keys:
+        return
+    column = 'rowid' if _dialect(conn) == 'sqlite' else 'doc_id'
+    conn.execute(text(f"DELETE FROM search_index WHERE {column} = :doc_id"),
+                 [{'doc_id': doc_id(kind, ref_id)} for kind, ref_id in keys])
+
+
+def index_rows(kind, ref_ids, conn=None):
+    """(Re)index specific rows, e.g. after a Core bulk insert."""
+    model, _, title_attr, body_attrs = SOURCES[kind]
+    columns = [model.id, getattr(model, title_attr)] + [getattr(model, a) for a in body_attrs]
+    conn = conn or db.session.connection()
+    if not supported(conn):
+        return
+    ref_ids = list(ref_ids)
+    for start in range(0, len(ref_ids), 500):
+        chunk = ref_ids[start:start + 500]
+        rows = conn.execute(select(*columns).where(model.id.in_(chunk))).all()
+        _upsert(conn, [(kind, r[0], r[1] or '', '\n'.join(filter(None, r[2:])))
+                       for r in rows])
+
+
+def rebuild_index(batch_size=2000):
+    """Drop and repopulate every document from the source tables."""
+    if not supported():
+        return 0
+    total = 0
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM search_index"))
+        for kind, (model, _, title_attr, body_attrs) in SOURCES.items():
+            columns = ([model.id, getattr(model, title_attr)]
+                       + [getattr(model, a) for a in body_attrs])
+            result = conn.execute(select(*columns).order_by(model.id)
+                                  .execution_options(yield_per=batch_size))
+            for batch in result.partitions():
+                _upsert(conn, [(kind, r[0], r[1] or '', '\n'.join(filter(None, r[2:])))
+                               for r in batch])
+                total += len(batch)
+    logger.info(f"Search index rebuilt with {total} documents")
+    return total
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """Mirror inserts, relevant updates and deletes into the index in the
+    flush's own transaction."""
+    upserts, deletes = [], []
+    for obj in session.new:
+        if type(obj) in KIND_BY_MODEL:
+            upserts.append(document_for(obj))
+    for obj in session.dirty:
+        kind = KIND_BY_MODEL.get(type(obj))
+        if kind is None:
+            continue
+        _, _, title_attr, body_attrs = SOURCES[kind]
+        state = inspect(obj)
+        if any(state.attrs[a].history.has_changes() for a in (title_attr, *body_attrs)):
+            upserts.append(document_for(obj))
+    for obj in session.deleted:
+        kind = KIND_BY_MODEL.get(type(obj))
+        if kind is not None:
+            deletes.append((kind, obj.id))
+    if not (upserts or deletes):
+        return
+    conn = session.connection()
+    if not supported(conn):
+        return
+    _delete(conn, deletes)
+    _upsert(conn, upserts)
+
+
+def _fts5_query(query):
+    """Turn free text into a safe FTS5 expression: every word must match,
+    the last one as a prefix so results appear while typing."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _highlight(fragment):
+    return Markup(str(escape(fragment or ''))
+                  .replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def search(query, limit=50):
+    """Return ranked hits as dicts with kind, id, title and snippet (Markup)."""
+    query = (query or '').strip()
+    if not query:
+        return []
+    dialect = _dialect(db.engine)
+    if dialect == 'sqlite':
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        rows = db.session.execute(text(
+            "SELECT rowid, highlight(search_index, 0, :s, :e), "
+            "snippet(search_index, 1, :s, :e, '…', 16) "
+            "FROM search_index WHERE search_index MATCH :q "
+            "ORDER BY bm25(search_index, 10.0, 1.0) LIMIT :n"
+        ), {'q': match, 's': MARK_START, 'e': MARK_END, 'n': limit}).all()
+    elif dialect == 'postgresql':
+        rows = db.session.execute(text(
+            "SELECT doc_id, "
+            "ts_headline('english', title, q, :opts_title), "
+            "ts_headline('english', body, q, :opts_body) "
+            "FROM search_index, websearch_to_tsquery('english', :q) AS q "
+            "WHERE document @@ q ORDER BY ts_rank_cd(document, q) DESC LIMIT :n"
+        ), {
+            'q': query, 'n': limit,
+            'opts_title': f'StartSel={MARK_START}, StopSel={MARK_END}, HighlightAll=true',
+            'opts_body': f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10',
+        }).all()
+    else:
+        return _like_search(query, limit)
+    return [{
+        'kind': KIND_BY_CODE[row[0] % 4],
+        'id': row[0] // 4,
+        'title': _highlight(row[1]),
+        'snippet': _highlight(row[2]),
+    } for row in rows]
+
+
+def _like_search(query, limit):
+    """Unranked title match for backends without a full-text index."""
+    hits = []
+    for kind, (model, _, title_attr, _) in SOURCES.items():
+        title = getattr(model, title_attr)
+        for ref_id, value in db.session.execute(
+                select(model.id, title).where(title.ilike(f'%{query}%')).limit(limit)):
+            hits.append({'kind': kind, 'id': ref_id, 'title': value, 'snippet': ''})
+    return hits[:limit]
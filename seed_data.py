@@ -3,7 +3,8 @@
 from datetime import date
 from museums_app import create_app
 from extensions import db
-from models import User, Artist, Artwork, Museum, Collection
+from models import User, Artist, Artwork, Museum, Collection, DashboardCounter
+import facets
 
 
 def seed():
@@ -268,6 +269,11 @@ def seed():
         db.session.add_all(collections)
         db.session.commit()
 
+        # The bulk deletes above bypass the counter and facet listeners
+        DashboardCounter.reconcile()
+        facets.rebuild_counts()
+        db.session.commit()
+
         print(f"Seeded: {len(artists)} artists, {len(artworks)} artworks, "
               f"{len(museums)} museums, {len(collections)} collection entries")
         print(f"Admin account: admin@museumcollection.com / Admin123!")
@@ -63,3 +63,77 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 });
+
+// Typeahead pickers for artist / artwork / museum fields (see LookupWidget in forms.py)
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.lookup').forEach(lookup => {
+        const url = lookup.dataset.lookupUrl;
+        const idInput = lookup.querySelector('[data-lookup-id]');
+        const textInput = lookup.querySelector('[data-lookup-input]');
+        const results = lookup.querySelector('.lookup-results');
+        let timer = null;
+        let request = 0;
+
+        function close() {
+            results.hidden = true;
+            results.innerHTML = '';
+        }
+
+        function choose(item) {
+            idInput.value = item.id;
+            textInput.value = item.label;
+            close();
+        }
+
+        textInput.addEventListener('input', function() {
+            idInput.value = '';
+            clearTimeout(timer);
+            const query = textInput.value.trim();
+            if (!query) {
+                close();
+                return;
+            }
+            timer = setTimeout(() => {
+                const current = ++request;
+                fetch(`${url}?q=${encodeURIComponent(query)}`, {
+                    headers: { 'Accept': 'application/json' }
+                })
+                    .then(response => response.json())
+                    .then(items => {
+                        if (current !== request) return;
+                        results.innerHTML = '';
+                        items.forEach(item => {
+                            const li = document.createElement('li');
+                            li.textContent = item.label;
+                            li.addEventListener('mousedown', e => {
+                                e.preventDefault();
+                                choose(item);
+                            });
+                            results.appendChild(li);
+                        });
+                        results.hidden = items.length === 0;
+                    });
+            }, 200);
+        });
+
+        textInput.addEventListener('blur', close);
+    });
+});
+
+// Facet filters: apply checkbox changes immediately and keep empty fields out of the URL
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('form[data-autosubmit]').forEach(form => {
+        const dropEmpty = () => {
+            form.querySelectorAll('input').forEach(input => {
+                if (input.type !== 'checkbox' && !input.value) input.disabled = true;
+            });
+        };
+        form.addEventListener('submit', dropEmpty);
+        form.querySelectorAll('input[type="checkbox"]').forEach(box => {
+            box.addEventListener('change', () => {
+                dropEmpty();
+                form.submit();
+            });
+        });
+    });
+});
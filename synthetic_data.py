@@ -0,0 +1,399 @@
+"""Generate a large synthetic catalogue for load and performance testing.
+
+    python synthetic_data.py --artworks 1000000 --seed 42
+
+Artists, museums and collection entries scale with ``--artworks`` unless
+given explicitly. Values are drawn from the ``forms.py`` choice sets with
+skewed weights (a few prolific artists and busy museums, many small ones),
+and dates and valuations follow plausible ranges, so list pages, facets and
+query plans behave the way they would on a real catalogue. The same seed
+always produces the same rows.
+
+Rows are written with Core ``executemany`` inserts, ``--batch-size`` rows per
+statement and ``--commit-every`` rows per transaction, with ids assigned
+here so foreign keys never need a round trip. Counters, table versions and
+the search index are brought up to date at the end.
+"""
+
+import math
+import random
+import time
+from array import array
+from bisect import bisect
+from datetime import date, datetime, timedelta, timezone
+import click
+from sqlalchemy import delete, func, select
+from sqlalchemy.schema import CreateIndex, DropIndex
+from museums_app import create_app
+from extensions import db
+from forms import ArtistForm, ArtworkForm, MuseumForm, CollectionForm
+from models import (User, Artist, Artwork, Museum, Collection, DashboardCounter,
+                    VERSIONED_TABLES, bump_versions)
+import facets
+import search as search_index
+
+FIRST_NAMES = [
+    'Anna', 'Pierre', 'Maria', 'Hans', 'Sofia', 'Kenji', 'Elena', 'Jan', 'Lucia', 'Omar',
+    'Clara', 'Diego', 'Ingrid', 'Pablo', 'Yuki', 'Henri', 'Amara', 'Lars', 'Isabel', 'Wei',
+    'Giovanni', 'Nadia', 'Thomas', 'Frida', 'Rafael', 'Agnes', 'Mateo', 'Hilde', 'Camille', 'Ravi',
+]
+LAST_NAMES = [
+    'Moreau', 'Vermeer', 'Rossi', 'Schmidt', 'Tanaka', 'Novak', 'Garcia', 'Lindqvist', 'Okafor',
+    'Dubois', 'Bianchi', 'Kowalski', 'Santos', 'Ivanova', 'Haddad', 'Becker', 'Nakamura', 'Costa',
+    'Jensen', 'Laurent', 'Romano', 'Weber', 'Alvarez', 'Chen', 'Murphy', 'Fischer', 'Petit',
+    'Marino', 'Hoffmann', 'Silva',
+]
+NATIONALITIES = [
+    'French', 'Italian', 'Dutch', 'Spanish', 'German', 'American', 'British', 'Japanese',
+    'Mexican', 'Russian', 'Belgian', 'Norwegian', 'Chinese', 'Brazilian', 'Nigerian',
+]
+# (city, state/province, country)
+CITIES = [
+    ('Paris', None, 'France'), ('New York City', 'New York', 'United States'),
+    ('London', None, 'United Kingdom'), ('Amsterdam', None, 'Netherlands'),
+    ('Madrid', None, 'Spain'), ('Florence', 'Tuscany', 'Italy'), ('Berlin', None, 'Germany'),
+    ('Tokyo', None, 'Japan'), ('Mexico City', None, 'Mexico'), ('Chicago', 'Illinois', 'United States'),
+    ('Vienna', None, 'Austria'), ('St. Petersburg', None, 'Russia'), ('Los Angeles', 'California', 'United States'),
+    ('Toronto', 'Ontario', 'Canada'), ('Sydney', 'New South Wales', 'Australia'), ('Oslo', None, 'Norway'),
+]
+TITLE_ADJECTIVES = [
+    'Golden', 'Quiet', 'Blue', 'Distant', 'Evening', 'Broken', 'Silent', 'Red', 'Winter',
+    'Morning', 'Hidden', 'Falling', 'Bright', 'Lost', 'Still', 'Green', 'Northern', 'Last',
+]
+TITLE_NOUNS = [
+    'Harbor', 'Garden', 'Woman', 'River', 'Field', 'Window', 'Bridge', 'Figure', 'Landscape',
+    'Portrait', 'Light', 'Sea', 'Forest', 'Table', 'Dancer', 'City', 'Mountain', 'Bathers',
+]
+# Free-text medium on artworks, keyed by the artist's primary medium
+ARTWORK_MEDIA = {
+    'Painting': ['Oil on canvas', 'Oil on panel', 'Acrylic on canvas', 'Tempera on panel', 'Watercolor on paper'],
+    'Sculpture': ['Bronze', 'Marble', 'Wood', 'Steel', 'Terracotta'],
+    'Drawing': ['Charcoal on paper', 'Graphite on paper', 'Ink on paper', 'Pastel on paper'],
+    'Printmaking': ['Etching', 'Lithograph', 'Woodcut', 'Screenprint'],
+    'Photography': ['Gelatin silver print', 'Chromogenic print', 'Inkjet print'],
+    'Mixed Media': ['Mixed media on canvas', 'Collage'],
+    'Digital Art': ['Digital print', 'Video'],
+    'Installation': ['Mixed media installation'],
+    'Other': ['Textile', 'Ceramic', 'Glass'],
+}
+GALLERIES = ['Main Gallery', 'East Wing', 'West Wing', 'Modern Wing', 'Sculpture Court',
+             'Gallery 1', 'Gallery 2', 'Gallery 3', 'Works on Paper', 'Upper Floor']
+
+# Relative weights for form choices; values not listed weigh 1.
+WEIGHTS = {
+    'artist_movement': {'Impressionism': 6, 'Contemporary': 10, 'Modern': 6, 'Realism': 4,
+                        'Renaissance': 3, 'Baroque': 3, 'Abstract Expressionism': 3,
+                        'Post-Impressionism': 3, 'Expressionism': 3, 'Surrealism': 2},
+    'primary_medium': {'Painting': 12, 'Sculpture': 4, 'Drawing': 3, 'Printmaking': 3,
+                       'Photography': 4, 'Mixed Media': 2},
+    'artwork_movement': {'Contemporary': 8, 'Impressionism': 5, 'Renaissance': 3, 'Baroque': 3,
+                         'Post-Impressionism': 3, 'Other': 4},
+    'subject': {'Portrait': 6, 'Landscape': 6, 'Still Life': 3, 'Abstract': 4, 'Religious': 2},
+    'dimension_unit': {'inches': 6, 'cm': 8},
+    'weight_unit': {'lbs': 6, 'kg': 6},
+    'museum_type': {'Art': 8, 'Modern Art': 4, 'History': 2},
+    'acquisition_method': {'Purchase': 10, 'Donation': 6, 'Bequest': 3, 'Transfer': 2},
+    'status': {'Active': 20, 'Storage': 8, 'On Loan': 3, 'In Conservation': 1, 'Deaccessioned': 1},
+}
+
+# Loads at least this large (and at least the table's current size) drop and
+# rebuild the table's indexes instead of maintaining them row by row. Needs
+# DROP/CREATE INDEX IF [NOT] EXISTS, so SQLite and Postgres only.
+REBUILD_INDEXES_ABOVE = 50000
+CREATED_BEFORE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _choices(field, weights):
+    """(values, cumulative weights) for a form SelectField's non-empty choices."""
+    values = [value for value, _ in field.kwargs['choices'] if value]
+    return values, list(_accumulate(weights.get(v, 1) for v in values))
+
+
+def _accumulate(numbers):
+    total = 0
+    for n in numbers:
+        total += n
+        yield total
+
+
+def _skewed(rng, n, power=3.0):
+    """Index in ``range(n)`` biased towards 0: a few entries get most picks."""
+    return int(n * rng.random() ** power)
+
+
+def _money(value, cap):
+    # Rounded floats bind as NUMERIC on every backend and are far cheaper
+    # to produce than Decimals at millions of rows.
+    return round(min(value, cap), 2)
+
+
+class Generator:
+    """Builds rows batch by batch from one seeded ``random.Random``."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.artist_movements = _choices(ArtistForm.art_movement, WEIGHTS['artist_movement'])
+        self.primary_media = _choices(ArtistForm.primary_medium, WEIGHTS['primary_medium'])
+        self.artwork_movements = _choices(ArtworkForm.art_movement, WEIGHTS['artwork_movement'])
+        self.subjects = _choices(ArtworkForm.subject, WEIGHTS['subject'])
+        self.dimension_units = _choices(ArtworkForm.dimension_unit, WEIGHTS['dimension_unit'])
+        self.weight_units = _choices(ArtworkForm.weight_unit, WEIGHTS['weight_unit'])
+        self.museum_types = _choices(MuseumForm.museum_type, WEIGHTS['museum_type'])
+        self.methods = _choices(CollectionForm.acquisition_method, WEIGHTS['acquisition_method'])
+        self.statuses = _choices(CollectionForm.status, WEIGHTS['status'])
+        # Per-artist (birth year, last active year, medium) and per-artwork
+        # creation year, so artworks fall within a lifetime and acquisitions
+        # follow creation.
+        self.artist_years = {}
+        self.artwork_years = array('H')
+        self.first_artwork_id = None
+
+    def pick(self, choices):
+        values, cumulative = choices
+        return values[bisect(cumulative, self.rng.random() * cumulative[-1])]
+
+    def _date(self, year):
+        day = int(self.rng.random() * 336)
+        return date(year, day // 28 + 1, day % 28 + 1)
+
+    def _created_at(self, i, n):
+        # Spread over the five years before a fixed date, in id order, so a
+        # seed reproduces the rows exactly.
+        return CREATED_BEFORE - timedelta(days=5 * 365 * (1 - i / max(n, 1)),
+                                          seconds=int(self.rng.random() * 86400))
+
+    def artists(self, first_id, n):
+        rng = self.rng
+        for i in range(n):
+            # Most catalogued artists are modern; a long tail goes back to 1400.
+            birth = 2000 - int(600 * rng.random() ** 2.5)
+            living = birth > 1940 and rng.random() < 0.7
+            death = None if living else min(birth + rng.randint(30, 95), 2024)
+            medium = self.pick(self.primary_media)
+            city, _, country = rng.choice(CITIES)
+            artist_id = first_id + i
+            self.artist_years[artist_id] = (birth, death or 2025, medium)
+            yield {
+                'id': artist_id,
+                'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {artist_id}',
+                'birth_date': self._date(birth),
+                'death_date': self._date(death) if death else None,
+                'is_living': living,
+                'birth_place': f'{city}, {country}',
+                'nationality': rng.choice(NATIONALITIES),
+                'art_movement': self.pick(self.artist_movements) if rng.random() < 0.9 else None,
+                'primary_medium': medium,
+                'bio': f'{medium} artist working in {city}.' if rng.random() < 0.5 else None,
+                'created_at': self._created_at(i, n),
+            }
+
+    def museums(self, first_id, n):
+        rng = self.rng
+        for i in range(n):
+            city, state, country = rng.choice(CITIES)
+            museum_type = self.pick(self.museum_types)
+            yield {
+                'id': first_id + i,
+                'name': f'{city} {museum_type} Museum {first_id + i}',
+                'museum_type': museum_type,
+                'city': city,
+                'state_province': state,
+                'country': country,
+                'established_date': self._date(rng.randint(1750, 2015)),
+                'annual_visitors': int(rng.lognormvariate(12, 1.2)),
+                'admission_fee': _money(rng.choice([0, 0, 10, 15, 20, 25, 30]), 10 ** 8 - 1),
+            }
+
+    def artworks(self, first_id, n, artist_ids):
+        rng = self.rng
+        self.first_artwork_id = self.first_artwork_id or first_id
+        for i in range(n):
+            artist_id = artist_ids[_skewed(rng, len(artist_ids))] if artist_ids else None
+            birth, last, medium = self.artist_years.get(artist_id, (1850, 2025, 'Painting'))
+            year = min(rng.randint(birth + 18, max(birth + 18, last)), 2025)
+            self.artwork_years.append(year)
+            height = rng.lognormvariate(3.3, 0.6)
+            if rng.random() < 0.15:
+                title = f'Untitled {rng.randint(1, 60)}'
+            else:
+                title = f'{rng.choice(TITLE_ADJECTIVES)} {rng.choice(TITLE_NOUNS)}'
+            yield {
+                'id': first_id + i,
+                'title': title,
+                'artist_id': artist_id,
+                'medium': rng.choice(ARTWORK_MEDIA[medium]),
+                'art_movement': self.pick(self.artwork_movements) if rng.random() < 0.85 else None,
+                'subject': self.pick(self.subjects) if rng.random() < 0.9 else None,
+                'creation_date': self._date(year),
+                'dimension_H': _money(height, 10 ** 8 - 1),
+                'dimension_W': _money(height * rng.uniform(0.5, 1.6), 10 ** 8 - 1),
+                'dimension_D': _money(rng.uniform(1, 40), 10 ** 8 - 1) if medium == 'Sculpture' else None,
+                'dimension_unit': self.pick(self.dimension_units),
+                'weight': _money(rng.lognormvariate(2.5, 1.0), 10 ** 8 - 1) if rng.random() < 0.4 else None,
+                'weight_unit': self.pick(self.weight_units),
+                # Median around $25k with a long tail into the millions.
+                'estimated_value': _money(rng.lognormvariate(10.1, 1.8), 10 ** 10 - 1),
+                'is_signed': rng.random() < 0.6,
+                'created_at': self._created_at(i, n),
+            }
+
+    def collections(self, first_id, n, museum_ids):
+        rng = self.rng
+        artworks = len(self.artwork_years)
+        for i in range(n):
+            # Walk the artworks in order (wrapping) so most are held once.
+            offset = i % artworks
+            created = self.artwork_years[offset]
+            acquired = rng.randint(min(created + 1, 2025), 2025)
+            museum_id = museum_ids[_skewed(rng, len(museum_ids), 2.0)]
+            on_display = rng.random() < 0.3
+            cost = rng.lognormvariate(9.5, 1.8)
+            yield {
+                'id': first_id + i,
+                'museum_id': museum_id,
+                'artwork_id': self.first_artwork_id + offset,
+                'accession_number': f'SYN.{museum_id}.{acquired}.{first_id + i}',
+                'acquisition_date': self._date(acquired),
+                'acquisition_method': self.pick(self.methods),
+                'acquisition_cost': _money(cost, 10 ** 10 - 1),
+                'status': self.pick(self.statuses),
+                'gallery_location': rng.choice(GALLERIES) if on_display else None,
+                'on_display': on_display,
+                'current_value': _money(cost * rng.uniform(0.8, 3), 10 ** 10 - 1),
+            }
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _next_id(conn, model):
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert(conn, model, rows, batch_size, commit_every, rebuild_indexes=False):
+    """Insert ``rows``, committing every ``commit_every`` rows; returns
+    (count, seconds).
+
+    With ``rebuild_indexes`` the table's secondary indexes are dropped for
+    the load and rebuilt afterwards: building an index from finished data is
+    several times faster than maintaining a dozen of them row by row.
+    """
+    table = model.__table__
+    started = time.perf_counter()
+    if rebuild_indexes:
+        for index in table.indexes:
+            conn.execute(DropIndex(index, if_exists=True))
+        conn.commit()
+    count = pending = 0
+    for batch in _batches(rows, batch_size):
+        conn.execute(table.insert(), batch)
+        count += len(batch)
+        pending += len(batch)
+        if pending >= commit_every:
+            conn.commit()
+            pending = 0
+    conn.commit()
+    if rebuild_indexes:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+        conn.commit()
+    return count, time.perf_counter() - started
+
+
+def generate(artworks, artists=None, museums=None, collections=None, seed=0,
+             batch_size=10000, commit_every=200000, reset=False, reindex=True, echo=print):
+    """Append (or with ``reset``, replace) a synthetic catalogue in the
+    current app's database and return ``{table: (rows, seconds)}``."""
+    artists = artists if artists is not None else max(1, artworks // 20)
+    museums = museums if museums is not None else max(5, int(math.sqrt(artworks)) // 4)
+    collections = collections if collections is not None else artworks * 3 // 5
+    gen = Generator(seed)
+    timings = {}
+    with db.engine.connect() as conn:
+        if conn.dialect.name == 'sqlite':
+            # Synthetic data is disposable: skip fsyncs for the load.
+            conn.exec_driver_sql('PRAGMA synchronous = OFF')
+            conn.exec_driver_sql('PRAGMA cache_size = -200000')
+        if reset:
+            for model in (Collection, Artwork, Artist, Museum):
+                conn.execute(delete(model.__table__))
+            conn.commit()
+        artist_id, museum_id = _next_id(conn, Artist), _next_id(conn, Museum)
+        artwork_id, collection_id = _next_id(conn, Artwork), _next_id(conn, Collection)
+        collections = collections if artworks and museums else 0
+        steps = [
+            ('artists', Artist, artists, lambda: gen.artists(artist_id, artists)),
+            ('museums', Museum, museums, lambda: gen.museums(museum_id, museums)),
+            ('artworks', Artwork, artworks, lambda: gen.artworks(
+                artwork_id, artworks, range(artist_id, artist_id + artists))),
+            ('collections', Collection, collections, lambda: gen.collections(
+                collection_id, collections, range(museum_id, museum_id + museums))),
+        ]
+        for name, model, n, rows in steps:
+            existing = conn.execute(select(func.count()).select_from(model.__table__)).scalar()
+            rebuild = (conn.dialect.name in ('sqlite', 'postgresql')
+                       and n >= max(REBUILD_INDEXES_ABOVE, existing))
+            count, seconds = _insert(conn, model, rows(), batch_size, commit_every,
+                                     rebuild_indexes=rebuild)
+            timings[name] = (count, seconds)
+            echo(f"{name}: {count} rows in {seconds:.1f}s "
+                 f"({count / seconds if seconds else 0:.0f} rows/sec)")
+        bump_versions(conn, VERSIONED_TABLES)
+        conn.commit()
+        if conn.dialect.name == 'sqlite':
+            conn.exec_driver_sql('PRAGMA synchronous = FULL')
+            conn.exec_driver_sql('ANALYZE')
+
+    if not db.session.execute(select(User.id).where(User.is_admin.is_(True))).first():
+        admin = User(username='admin', email='admin@museumcollection.com', is_admin=True)
+        admin.set_password('Admin123!')
+        db.session.add(admin)
+        db.session.commit()
+    DashboardCounter.reconcile()
+    facets.rebuild_counts()
+    db.session.commit()
+    if reindex and search_index.supported():
+        started = time.perf_counter()
+        search_index.ensure_index()
+        indexed = search_index.rebuild_index()
+        timings['search_index'] = (indexed, time.perf_counter() - started)
+        echo(f"search index: {indexed} documents in {timings['search_index'][1]:.1f}s")
+    return timings
+
+
+@click.command()
+@click.option('--artworks', type=click.IntRange(0), default=100000, show_default=True)
+@click.option('--artists', type=click.IntRange(0), default=None, help='Default: artworks / 20.')
+@click.option('--museums', type=click.IntRange(0), default=None, help='Default: sqrt(artworks) / 4, at least 5.')
+@click.option('--collections', type=click.IntRange(0), default=None, help='Default: 60% of artworks.')
+@click.option('--seed', type=int, default=0, show_default=True, help='Same seed, same rows.')
+@click.option('--batch-size', type=click.IntRange(1), default=10000, show_default=True,
+              help='Rows per INSERT statement.')
+@click.option('--commit-every', type=click.IntRange(1), default=200000, show_default=True,
+              help='Rows per transaction.')
+@click.option('--reset', is_flag=True, help='Delete existing artists, artworks, museums and collections first.')
+@click.option('--no-search-index', is_flag=True, help='Skip rebuilding the full-text index.')
+def main(artworks, artists, museums, collections, seed, batch_size, commit_every, reset,
+         no_search_index):
+    """Fill the configured database with a synthetic catalogue."""
+    app = create_app('development')
+    with app.app_context():
+        started = time.perf_counter()
+        timings = generate(artworks, artists, museums, collections, seed=seed,
+                           batch_size=batch_size, commit_every=commit_every,
+                           reset=reset, reindex=not no_search_index, echo=click.echo)
+        elapsed = time.perf_counter() - started
+        rows = sum(count for name, (count, _) in timings.items() if name != 'search_index')
+        click.echo(f"Total: {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/sec overall)")
+
+
+if __name__ == '__main__':
+    main()
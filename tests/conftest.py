@@ -0,0 +1,36 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TestingConfig, config  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    class TestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        SCHEMA_BOOTSTRAP = 'create'
+        WTF_CSRF_ENABLED = False
+        # Measure the views themselves, not 304s or cached fragments.
+        CONDITIONAL_GET = False
+        FRAGMENT_CACHE_ENABLED = False
+        METRICS_ENABLED = False
+        # Model calls go to the fake provider; don't cache them across runs.
+        AI_CACHE_ENABLED = False
+
+    monkeypatch.setitem(config, 'tests', TestConfig)
+    from museums_app import create_app
+    from extensions import db
+    app = create_app('tests')
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
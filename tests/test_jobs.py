@@ -0,0 +1,127 @@
+"""The jobs table queue: dedupe, claim order, retries and draining."""
+
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, update
+import jobs
+from extensions import db
+from models import Artwork, Job
+
+
+@pytest.fixture(autouse=True)
+def noop_handler(monkeypatch):
+    monkeypatch.setitem(jobs.HANDLERS, 'noop', lambda payload: None)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _set(job_id, **values):
+    db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+    db.session.commit()
+
+
+def test_enqueue_dedupes_against_queued_jobs(app):
+    with app.app_context():
+        first = jobs.enqueue('noop', {'n': 1}, dedupe_key='noop:1')
+        assert jobs.enqueue('noop', {'n': 1}, dedupe_key='noop:1').id == first.id
+        assert jobs.enqueue('noop', {'n': 2}, dedupe_key='noop:2').id != first.id
+
+        # Once it is running, a new request queues a follow-up job.
+        assert jobs.claim_next() == first.id
+        follow_up = jobs.enqueue('noop', {'n': 1}, dedupe_key='noop:1')
+        assert follow_up.id != first.id
+        assert jobs.enqueue('noop', {'n': 1}, dedupe_key='noop:1').id == follow_up.id
+
+
+def test_claim_next_orders_by_run_after_and_skips_busy_keys(app):
+    with app.app_context():
+        later = jobs.enqueue('noop').id
+        sooner = jobs.enqueue('noop').id
+        future = jobs.enqueue('noop').id
+        _set(later, run_after=_now() - timedelta(seconds=10))
+        _set(sooner, run_after=_now() - timedelta(seconds=20))
+        _set(future, run_after=_now() + timedelta(hours=1))
+
+        assert jobs.claim_next() == sooner
+        assert jobs.claim_next() == later
+        assert jobs.claim_next() is None  # the remaining job isn't due yet
+
+        running = jobs.enqueue('noop', dedupe_key='key').id
+        assert jobs.claim_next() == running
+        blocked = jobs.enqueue('noop', dedupe_key='key').id
+        free = jobs.enqueue('noop').id
+        assert jobs.claim_next() == free
+        assert jobs.claim_next() is None
+        assert jobs.run_job(running)
+        assert jobs.claim_next() == blocked
+
+
+def test_blocked_keys_do_not_starve_later_jobs(app):
+    with app.app_context():
+        for i in range(15):
+            jobs.enqueue('noop', dedupe_key=f'key:{i}')
+            assert jobs.claim_next() is not None
+            jobs.enqueue('noop', dedupe_key=f'key:{i}')
+        free = jobs.enqueue('noop').id
+        assert jobs.claim_next() == free
+        assert jobs.claim_next() is None
+
+
+def test_failed_job_is_retried_with_backoff(app, monkeypatch):
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError('temporary')
+
+    monkeypatch.setitem(jobs.HANDLERS, 'flaky', flaky)
+    with app.app_context():
+        job_id = jobs.enqueue('flaky', {'n': 1}, max_attempts=2).id
+        assert jobs.run_pending() == 1
+
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts, job.last_error) == ('queued', 1, 'temporary')
+        delay = (job.run_after.replace(tzinfo=timezone.utc) - _now()).total_seconds()
+        base = app.config['JOBS_RETRY_BASE_SECONDS']
+        assert base * 0.7 < delay <= base * 1.25
+        assert jobs.run_pending() == 0  # not due yet
+
+        _set(job_id, run_after=_now())
+        assert jobs.run_pending() == 1
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts, job.last_error) == ('done', 2, None)
+        assert calls == [{'n': 1}, {'n': 1}]
+
+
+def test_failed_job_gives_up_after_max_attempts(app, monkeypatch):
+    def broken(payload):
+        raise RuntimeError('permanent')
+
+    monkeypatch.setitem(jobs.HANDLERS, 'broken', broken)
+    with app.app_context():
+        job_id = jobs.enqueue('broken', max_attempts=1).id
+        assert jobs.run_pending() == 1
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts, job.last_error) == ('failed', 1, 'permanent')
+        assert job.finished_at is not None
+
+
+def test_run_pending_drains_the_queue(app):
+    with app.app_context():
+        artworks = [Artwork(title=f'Study {i}', medium='Oil on canvas') for i in range(3)]
+        db.session.add_all(artworks)
+        db.session.commit()
+        ids = [artwork.id for artwork in artworks]
+        for artwork_id in ids:
+            jobs.enqueue('artwork_description', {'artwork_id': artwork_id},
+                         dedupe_key=f'artwork_description:{artwork_id}')
+
+        assert jobs.run_pending() == len(ids)
+        assert jobs.claim_next() is None
+        statuses = db.session.execute(select(Job.status)).scalars().all()
+        assert statuses == ['done'] * len(ids)
+        for artwork_id in ids:
+            assert db.session.get(Artwork, artwork_id).ai_description.startswith('Offline description')
@@ -0,0 +1,53 @@
+"""The list pages render in a fixed number of statements, however many rows
+the tables hold (no lazy load per row)."""
+
+import pytest
+from sqlalchemy import event
+import facets
+import synthetic_data
+from extensions import db
+
+PAGES = ('/', '/artworks', '/collections')
+
+
+def _grow(app, artworks):
+    # One artist per artwork, so a per-row lazy load can't be absorbed by
+    # the identity map.
+    with app.app_context():
+        synthetic_data.generate(artworks, artists=artworks, museums=artworks,
+                                echo=lambda *args: None)
+
+
+def _count_statements(app, client, url):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    facets.invalidate()
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', PAGES)
+def test_query_count_is_independent_of_row_count(app, client, url):
+    # Fewer rows than a page, then several pages' worth.
+    _grow(app, 5)
+    # The first request also reconciles the dashboard counters; measure
+    # steady state.
+    client.get(url)
+    small = _count_statements(app, client, url)
+
+    _grow(app, 200)
+    client.get(url)
+    large = _count_statements(app, client, url)
+
+    assert small == large
+    assert small <= 10